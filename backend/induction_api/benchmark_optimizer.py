@@ -0,0 +1,349 @@
+"""
+Benchmark suite for the stabling optimizer
+
+Generates reproducible synthetic depots and fleets (10 to 5,000 trains) and
+measures, for each engine configuration:
+
+- evaluations per second of the batched fitness function
+- time to the first feasible plan (no hard-constraint violations)
+- time to a target score (by default the greedy constructive plan's score)
+- peak traced memory of the run
+
+Results are written as JSON so runs can be compared with --compare.
+
+Usage:
+    python benchmark_optimizer.py --sizes 10,100,1000 --output bench.json
+    python benchmark_optimizer.py --compare bench.json --output bench_new.json
+"""
+import argparse
+import contextlib
+import csv
+import io
+import json
+import os
+import platform
+import random
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from optimize import StablingOptimizer, DepotBay, Train, CleaningSlot, READINESS_STATES, cp_model
+
+DEFAULT_SIZES = (10, 100, 1000, 5000)
+
+# Engine configurations: optimize() keyword arguments, or a dedicated engine
+CONFIGS = {
+    "ga": {"engine": "ga"},
+    "ga-seeded": {"engine": "ga", "seed_fraction": 0.1},
+    "memetic": {"engine": "ga", "local_search_top_k": 4, "local_search_moves": 100},
+    "ga-workers": {"engine": "ga", "workers": 4},
+    "ga-islands": {"engine": "ga", "islands": 4, "migration_interval": 10},
+    "ga-permutation": {"engine": "ga", "encoding": "permutation"},
+    "local": {"engine": "local"},
+    "cpsat": {"engine": "cpsat"},
+}
+DEFAULT_CONFIGS = ("ga", "ga-seeded", "memetic", "local", "cpsat")
+
+# Rake lengths in meters (3-car and 6-car sets) and their share of the fleet
+RAKE_LENGTHS = (66, 132)
+RAKE_LENGTH_WEIGHTS = (0.7, 0.3)
+READINESS_WEIGHTS = (0.7, 0.15, 0.15)  # ready, maintenance, cleaning
+
+
+def generate_depot(bay_count: int, rng: random.Random) -> Dict[str, DepotBay]:
+    """
+    Synthetic depot: bays along a ladder of stabling lines
+
+    Capacities fit one or two 3-car rakes, about 60% of bays can clean, and
+    distance to exit grows along the ladder. Each bay connects to its
+    neighbours on the ladder plus the occasional crossover.
+    """
+    bays = {}
+    ids = [f"BAY-{i + 1}" for i in range(bay_count)]
+    lines = max(1, int(round(bay_count ** 0.5)))
+    for i, bay_id in enumerate(ids):
+        connections = [ids[j] for j in (i - 1, i + 1) if 0 <= j < bay_count]
+        if bay_count > 2 and rng.random() < 0.2:
+            crossover = ids[rng.randrange(bay_count)]
+            if crossover != bay_id and crossover not in connections:
+                connections.append(crossover)
+        bays[bay_id] = DepotBay(
+            id=bay_id,
+            capacity=rng.choice((70, 140, 140, 150)),
+            cleaning_enabled=rng.random() < 0.6,
+            distance_to_exit=i // lines,
+            connections=connections
+        )
+    return bays
+
+
+def _departure(rng: random.Random) -> str:
+    """Departure time clustered around the morning peak (05:00-10:00)"""
+    minutes = int(np.clip(rng.gauss(6.5 * 60, 60), 5 * 60, 10 * 60))
+    minutes -= minutes % 5
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def generate_fleet(train_count: int, rng: random.Random) -> List[Train]:
+    """Synthetic fleet with mixed lengths, peak-hour departures and readiness"""
+    return [
+        Train(
+            id=f"RAKE-{i + 1}",
+            length=rng.choices(RAKE_LENGTHS, RAKE_LENGTH_WEIGHTS)[0],
+            needs_cleaning=rng.random() < 0.3,
+            departure_time=_departure(rng),
+            readiness=rng.choices(READINESS_STATES, READINESS_WEIGHTS)[0],
+            priority=rng.randint(1, 5)
+        )
+        for i in range(train_count)
+    ]
+
+
+def generate_cleaning_slots(bays: Dict[str, DepotBay], rng: random.Random) -> List[CleaningSlot]:
+    """One evening cleaning slot per cleaning-enabled bay"""
+    slots = []
+    for bay in bays.values():
+        if bay.cleaning_enabled:
+            start = rng.choice((19, 20, 21))
+            slots.append(CleaningSlot(bay_id=bay.id, start_time=f"{start:02d}:00",
+                                      end_time=f"{start + 2:02d}:00",
+                                      available=rng.random() < 0.9))
+    return slots
+
+
+def build_optimizer(train_count: int, bay_count: Optional[int] = None,
+                    seed: int = 0) -> StablingOptimizer:
+    """Optimizer loaded with a synthetic problem; the same seed gives the same data"""
+    rng = random.Random(seed)
+    bay_count = bay_count or max(4, int(round(train_count * 1.1)))
+    optimizer = StablingOptimizer()
+    optimizer.depot_bays = generate_depot(bay_count, rng)
+    optimizer.trains = generate_fleet(train_count, rng)
+    optimizer.cleaning_slots = generate_cleaning_slots(optimizer.depot_bays, rng)
+    optimizer.compile_problem()
+    return optimizer
+
+
+def export_dataset(optimizer: StablingOptimizer, directory: str) -> None:
+    """Write a synthetic problem in the depot_layout.json / rakes.csv / cleaning_slots.csv formats"""
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, "depot_layout.json"), 'w', encoding='utf-8') as f:
+        json.dump({"bays": [
+            {"id": bay.id, "capacity": bay.capacity, "cleaning_enabled": bay.cleaning_enabled,
+             "distance_to_exit": bay.distance_to_exit, "connections": bay.connections}
+            for bay in optimizer.depot_bays.values()
+        ]}, f, indent=2)
+    with open(os.path.join(directory, "rakes.csv"), 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["train_id", "length", "needs_cleaning", "departure_time",
+                         "readiness", "priority"])
+        for train in optimizer.trains:
+            writer.writerow([train.id, train.length, str(train.needs_cleaning).lower(),
+                             train.departure_time, train.readiness, train.priority])
+    with open(os.path.join(directory, "cleaning_slots.csv"), 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["bay_id", "start_time", "end_time", "available"])
+        for slot in optimizer.cleaning_slots:
+            writer.writerow([slot.bay_id, slot.start_time, slot.end_time,
+                             str(slot.available).lower()])
+
+
+def measure_evaluations(optimizer: StablingOptimizer, population_size: int,
+                        min_seconds: float = 0.5) -> float:
+    """Genomes scored per second by the batched fitness function"""
+    problem = optimizer.problem
+    rng = np.random.default_rng(0)
+    genomes = rng.integers(0, problem.bay_count, size=(population_size, problem.train_count))
+    optimizer.evaluate_population(genomes)  # warm-up
+
+    evaluated, started = 0, time.perf_counter()
+    while True:
+        optimizer.evaluate_population(genomes)
+        evaluated += population_size
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_seconds:
+            return evaluated / elapsed
+
+
+def run_engine(optimizer: StablingOptimizer, config: Dict, args: argparse.Namespace,
+               on_progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+    """Run one engine configuration and return its result"""
+    options = {k: v for k, v in config.items() if k != "engine"}
+    with contextlib.redirect_stdout(io.StringIO()):
+        if config["engine"] == "local":
+            return optimizer.reoptimize(time_limit_ms=args.time_limit_ms)
+        if config["engine"] == "cpsat":
+            return optimizer.optimize_cpsat(time_limit_ms=args.time_limit_ms)
+        return optimizer.optimize(generations=args.generations,
+                                  population_size=args.population_size,
+                                  time_limit_ms=args.time_limit_ms,
+                                  on_progress=on_progress, **options)
+
+
+def benchmark_config(optimizer: StablingOptimizer, name: str, target: float,
+                     args: argparse.Namespace) -> Dict:
+    """Time-to-feasible, time-to-target and peak memory of one configuration"""
+    config = CONFIGS[name]
+    first_feasible = reached_target = None
+
+    def on_progress(event: Dict) -> None:
+        nonlocal first_feasible, reached_target
+        if first_feasible is None and event["violations"] == 0:
+            first_feasible = event["elapsedMs"]
+        if reached_target is None and event["maxFitness"] >= target:
+            reached_target = event["elapsedMs"]
+
+    random.seed(args.seed)
+    np.random.seed(args.seed)
+    started = time.perf_counter()
+    result = run_engine(optimizer, config, args, on_progress)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    summary = result["optimization_summary"]
+    best = result["statistics"]["bestFitness"]
+    # Same count as the per-generation progress: unlike totalViolations it
+    # includes trains sharing a bay in "single" mode
+    violations = optimizer.hard_violations(optimizer.assignment_genome(result["assignments"]))
+    if config["engine"] != "ga":
+        # No per-generation progress: only the final plan is known
+        first_feasible = elapsed_ms if violations == 0 else None
+        reached_target = elapsed_ms if best >= target else None
+
+    peak_mb = None
+    if args.memory:
+        random.seed(args.seed)
+        np.random.seed(args.seed)
+        tracemalloc.start()
+        run_engine(optimizer, config, args)
+        peak_mb = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+
+    return {
+        "config": name,
+        "bestScore": float(best),
+        "violations": violations,
+        "generationsRun": summary["generationsRun"],
+        "stopReason": result["statistics"].get("stopReason"),
+        "elapsedMs": round(elapsed_ms, 1),
+        "timeToFirstFeasibleMs": None if first_feasible is None else round(first_feasible, 1),
+        "timeToTargetMs": None if reached_target is None else round(reached_target, 1),
+        "peakMemoryMb": None if peak_mb is None else round(peak_mb, 2)
+    }
+
+
+def run_benchmarks(args: argparse.Namespace) -> Dict:
+    """Benchmark every size x configuration and collect the report"""
+    results = []
+    for size in args.sizes:
+        optimizer = build_optimizer(size, args.bays, seed=args.seed)
+        problem = optimizer.problem
+        if args.export:
+            export_dataset(optimizer, os.path.join(args.export, f"trains_{size}"))
+
+        # Target: the greedy constructive plan's score, scaled by --target-ratio
+        # (ratios below 1 loosen it, also for negative scores)
+        greedy_score = optimizer.evaluate_population([optimizer.greedy_assignment()])[0]
+        target = float(greedy_score) - abs(float(greedy_score)) * (1 - args.target_ratio)
+        evals_per_second = measure_evaluations(optimizer, args.population_size)
+        print(f"📊 {problem.train_count} trains, {problem.bay_count} bays: "
+              f"{evals_per_second:,.0f} evaluations/s, target score {target:.1f}")
+
+        for name in args.configs:
+            if name == "cpsat" and (cp_model is None or size > args.cpsat_max_trains):
+                print(f"   ⏭️  {name}: skipped")
+                continue
+            row = benchmark_config(optimizer, name, target, args)
+            row.update(trains=problem.train_count, bays=problem.bay_count,
+                       evaluationsPerSecond=round(evals_per_second, 1), targetScore=target)
+            results.append(row)
+            print(f"   {name:<10} score {row['bestScore']:>10.1f}  "
+                  f"feasible {row['timeToFirstFeasibleMs']} ms  target {row['timeToTargetMs']} ms  "
+                  f"total {row['elapsedMs']} ms  peak {row['peakMemoryMb']} MB")
+        optimizer.close_pool()
+
+    return {
+        "generatedAt": datetime.now(timezone.utc).isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpuCount": os.cpu_count()
+        },
+        "settings": {
+            "seed": args.seed,
+            "generations": args.generations,
+            "populationSize": args.population_size,
+            "timeLimitMs": args.time_limit_ms,
+            "targetRatio": args.target_ratio
+        },
+        "results": results
+    }
+
+
+def compare_reports(previous: Dict, current: Dict) -> None:
+    """Print per size/config changes against an earlier report"""
+    before = {(r["trains"], r["config"]): r for r in previous.get("results", [])}
+    print("\n📈 Comparison with previous run (negative time change is faster):")
+    for row in current["results"]:
+        old = before.get((row["trains"], row["config"]))
+        if old is None:
+            continue
+        changes = []
+        for key in ("evaluationsPerSecond", "elapsedMs", "timeToTargetMs", "peakMemoryMb", "bestScore"):
+            if old.get(key) and row.get(key) is not None:
+                changes.append(f"{key} {100 * (row[key] - old[key]) / old[key]:+.1f}%")
+        print(f"   {row['trains']:>5} trains {row['config']:<10} " + ", ".join(changes))
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the stabling optimizer")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="Comma-separated train counts")
+    parser.add_argument("--bays", type=int, default=None,
+                        help="Bay count (default: 1.1 x trains)")
+    parser.add_argument("--configs", default=",".join(DEFAULT_CONFIGS),
+                        help=f"Comma-separated configurations from {', '.join(CONFIGS)}")
+    parser.add_argument("--generations", type=int, default=50)
+    parser.add_argument("--population-size", type=int, default=100)
+    parser.add_argument("--time-limit-ms", type=int, default=30000,
+                        help="Wall-clock budget per run")
+    parser.add_argument("--target-ratio", type=float, default=1.0,
+                        help="Target score as a multiple of the greedy plan's score")
+    parser.add_argument("--cpsat-max-trains", type=int, default=50,
+                        help="Skip CP-SAT above this many trains")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--no-memory", dest="memory", action="store_false",
+                        help="Skip the traced peak-memory rerun")
+    parser.add_argument("--export", default=None,
+                        help="Also write each synthetic dataset to this directory")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", default=None, help="Earlier JSON report to compare with")
+    args = parser.parse_args(argv)
+
+    args.sizes = [int(s) for s in args.sizes.split(",") if s]
+    args.configs = [c for c in args.configs.split(",") if c]
+    unknown = [c for c in args.configs if c not in CONFIGS]
+    if unknown:
+        parser.error(f"unknown configurations: {', '.join(unknown)}")
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    print(f"🏁 Benchmarking sizes {args.sizes} with {args.configs}")
+    report = run_benchmarks(args)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare_reports(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,86 @@
+import asyncio
+import bisect
+import copy
 import json
 import csv
 import random
-from typing import List, Dict, Tuple, Optional
-from dataclasses import dataclass
-from fastapi import FastAPI, HTTPException
+import hashlib
+import heapq
+import re
+import multiprocessing
+import pickle
+import threading
+import uuid
+from collections import OrderedDict, Counter, deque
+from itertools import groupby
+from concurrent.futures import ProcessPoolExecutor, Future
+from typing import List, Dict, Tuple, Optional, Callable
+from dataclasses import dataclass, field, asdict
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 from deap import base, creator, tools, algorithms
 import numpy as np
 import os
+import time
+
+try:
+    from ortools.sat.python import cp_model
+except ImportError:  # CP-SAT engine is optional
+    cp_model = None
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DEPOT_FILE = os.path.join(BASE_DIR, "depot_layout.json")
 RAKES_FILE = os.path.join(BASE_DIR, "rakes.csv")
 CLEANING_FILE = os.path.join(BASE_DIR, "cleaning_slots.csv")
+STATE_FILE = os.path.join(BASE_DIR, "sample_data", "stabling_state.csv")
+
+# Further depots: <OPTIMIZER_DEPOTS_DIR>/<depot_id>/ holding the same files
+DEPOTS_DIR = os.environ.get("OPTIMIZER_DEPOTS_DIR") or os.path.join(BASE_DIR, "depots")
+MAX_LOADED_DEPOTS = int(os.environ.get("OPTIMIZER_MAX_LOADED_DEPOTS", "8"))
+DEFAULT_DEPOT = "default"  # the files above, loaded at startup
+DEPOT_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+# File names of result cache entries; nothing else in the cache directory is touched
+RESULT_FILE_PATTERN = re.compile(r"^[0-9a-f]{32}\.json$")
+# Minimum seconds between checks of a depot's data files for changes (0: never check)
+RELOAD_CHECK_SECONDS = float(os.environ.get("OPTIMIZER_RELOAD_CHECK_SECONDS", "1"))
+
+# Optimization job queue limits
+MAX_CONCURRENT_JOBS = int(os.environ.get("OPTIMIZER_MAX_CONCURRENT_JOBS", "2"))
+MAX_QUEUED_JOBS = int(os.environ.get("OPTIMIZER_MAX_QUEUED_JOBS", "16"))
+JOB_RESULT_TTL_SECONDS = float(os.environ.get("OPTIMIZER_JOB_RESULT_TTL", "3600"))
+PROGRESS_POLL_SECONDS = 0.2
+
+# Uploaded problem datasets kept for /api/optimize dataset_id requests
+MAX_DATASETS = int(os.environ.get("OPTIMIZER_MAX_DATASETS", "32"))
 
+# Result cache for /api/optimize; set OPTIMIZER_RESULT_CACHE_DIR to persist it
+RESULT_CACHE_SIZE = int(os.environ.get("OPTIMIZER_RESULT_CACHE_SIZE", "64"))
+RESULT_CACHE_DIR = os.environ.get("OPTIMIZER_RESULT_CACHE_DIR") or None
+
+READINESS_STATES = ("ready", "maintenance", "cleaning")
+# Cleaning is planned on an overnight clock: times before STABLING_DAY_START
+# belong to the next morning, so an evening slot serves an early departure
+STABLING_DAY_START = 12 * 60
+NO_CLEANING = 48 * 60 + 1  # bay_cleaning_ready for bays that can never clean in time
+SLOT_KEY_SPAN = 3 * 24 * 60  # above every slot end and deadline on the overnight clock
+GENOME_ENCODINGS = ("assignment", "permutation")
+# "single": one train per bay; "lane": bays are dead-end lanes packed by length
+CAPACITY_MODES = ("single", "lane")
+# CP-SAT objective coefficients are fitness terms times this, rounded; keeps
+# fractional weights (e.g. a relocation_penalty of 0.4) in the model
+CPSAT_OBJECTIVE_SCALE = 100
+
+# /api/optimize fields that must be integers or numbers; OPTIONAL_PARAMS may be null
+INTEGER_PARAMS = ("generations", "population_size", "fitness_cache_size", "workers", "islands",
+                  "migration_interval", "migrants", "time_limit_ms", "stagnation_generations",
+                  "seed", "local_search_top_k", "local_search_moves")
+NUMBER_PARAMS = ("seed_fraction", "relocation_penalty")
+OPTIONAL_PARAMS = ("time_limit_ms", "seed")
+
+# Per-generation timing columns of the GA logbook (seconds)
+GENERATION_TIMINGS = ("selectSeconds", "varySeconds", "evalSeconds", "localSeconds", "seconds")
 
 
 @dataclass
@@ -43,6 +109,7 @@ class Train:
     departure_time: str  # "HH:MM" format
     readiness: str  # "ready", "maintenance", "cleaning"
     priority: int  # 1=highest, 5=lowest
+    arrival_time: Optional[str] = None  # "HH:MM" arrival at the depot, if known
 
     def __post_init__(self):
         """Validate train data after initialization"""
@@ -50,8 +117,10 @@ class Train:
             raise ValueError(f"Train {self.id}: length must be positive")
         if self.priority not in range(1, 6):
             raise ValueError(f"Train {self.id}: priority must be 1-5")
-        if self.readiness not in ["ready", "maintenance", "cleaning"]:
+        if self.readiness not in READINESS_STATES:
             raise ValueError(f"Train {self.id}: invalid readiness status")
+        if self.arrival_time is not None:
+            self.arrival_minutes  # raises on a malformed time
 
     @property
     def departure_minutes(self) -> int:
@@ -61,6 +130,17 @@ class Train:
             return hours * 60 + minutes
         except ValueError:
             raise ValueError(f"Train {self.id}: invalid departure time format")
+    
+    @property
+    def arrival_minutes(self) -> Optional[int]:
+        """Arrival time in minutes since midnight, None when not given"""
+        if self.arrival_time is None:
+            return None
+        try:
+            hours, minutes = map(int, self.arrival_time.split(':'))
+            return hours * 60 + minutes
+        except ValueError:
+            raise ValueError(f"Train {self.id}: invalid arrival time format")
 
 
 @dataclass
@@ -83,6 +163,773 @@ class CleaningSlot:
         except ValueError as e:
             raise ValueError(f"Cleaning slot for bay {self.bay_id}: {str(e)}")
 
+    @property
+    def start_minutes(self) -> int:
+        """Slot start in minutes since midnight"""
+        hours, minutes = map(int, self.start_time.split(':'))
+        return hours * 60 + minutes
+
+    @property
+    def end_minutes(self) -> int:
+        """Slot end in minutes since midnight"""
+        hours, minutes = map(int, self.end_time.split(':'))
+        return hours * 60 + minutes
+
+
+def _overnight_minutes(minutes):
+    """Clock minutes on the overnight cleaning clock (see STABLING_DAY_START)"""
+    return minutes + 24 * 60 * (np.asarray(minutes) < STABLING_DAY_START)
+
+
+def _flag(value) -> bool:
+    """A boolean from JSON (true/false) or CSV ("true"/"false") data"""
+    return value if isinstance(value, bool) else str(value).lower() == 'true'
+
+
+def _parse_bay(record: Dict) -> DepotBay:
+    """A DepotBay from one depot_layout.json "bays" record"""
+    return DepotBay(
+        id=record['id'],
+        capacity=record['capacity'],
+        cleaning_enabled=record['cleaning_enabled'],
+        distance_to_exit=record['distance_to_exit'],
+        connections=record.get('connections', [])
+    )
+
+
+def _parse_train(row: Dict) -> Train:
+    """A Train from one rakes.csv row (or a record with the same fields)"""
+    return Train(
+        id=row['train_id'],
+        length=int(row['length']),
+        needs_cleaning=_flag(row['needs_cleaning']),
+        departure_time=row['departure_time'],
+        readiness=row['readiness'],
+        priority=int(row['priority']),
+        arrival_time=(row.get('arrival_time') or '').strip() or None
+    )
+
+
+def _parse_cleaning_slot(row: Dict) -> CleaningSlot:
+    """A CleaningSlot from one cleaning_slots.csv row (or a record with the same fields)"""
+    return CleaningSlot(
+        bay_id=row['bay_id'],
+        start_time=row['start_time'],
+        end_time=row['end_time'],
+        available=_flag(row['available'])
+    )
+
+
+def _frozen(values, dtype) -> np.ndarray:
+    """Build a read-only NumPy column"""
+    column = np.array(values, dtype=dtype)
+    column.setflags(write=False)
+    return column
+
+
+def _drop_cheapest(trains: List[int], ready: List[int], losses: List[float]) -> List[int]:
+    """
+    Trains of one lane left without a cleaning slot
+    
+    trains come in (deadline, index) order, with the slots ready by each
+    one's deadline and the score it would lose without one. Each train joins
+    a min-heap of the trains keeping a slot, keyed by that loss; when the heap
+    outgrows the slots ready, its cheapest train drops out. For slots nested
+    by deadline like these, that keeps the most valuable set of trains.
+    """
+    keeping, dropped = [], []
+    for train, count, loss in zip(trains, ready, losses):
+        heapq.heappush(keeping, (loss, train))
+        if len(keeping) > count:
+            dropped.append(heapq.heappop(keeping)[1])
+    return dropped
+
+
+def _track_graph(bays: List[DepotBay]) -> np.ndarray:
+    """
+    Shortest exit paths over the bay connection graph
+    
+    Connections are treated as undirected track. A multi-source BFS from the
+    bays nearest the exit (lowest distance_to_exit) gives every bay its
+    shortest path out; the bays on that path are the ones whose trains block
+    it. Returns the (bay_count x depth) path table padded with bay_count,
+    with no columns when no bay lists connections. Bays the exit cannot
+    reach have an empty path.
+    """
+    bay_count = len(bays)
+    index = {bay.id: b for b, bay in enumerate(bays)}
+    neighbours = [set() for _ in bays]
+    for b, bay in enumerate(bays):
+        for other in bay.connections:
+            if other in index and index[other] != b:
+                neighbours[b].add(index[other])
+                neighbours[index[other]].add(b)
+    if not any(neighbours):
+        return np.zeros((bay_count, 0), np.intp)
+    
+    nearest = min(bay.distance_to_exit for bay in bays)
+    parent = [-1] * bay_count
+    seen = [bay.distance_to_exit == nearest for bay in bays]
+    queue = deque(b for b in range(bay_count) if seen[b])
+    while queue:
+        b = queue.popleft()
+        for n in sorted(neighbours[b]):
+            if not seen[n]:
+                seen[n] = True
+                parent[n] = b
+                queue.append(n)
+    
+    paths = []
+    for b in range(bay_count):
+        path, a = [], parent[b]
+        while a >= 0:
+            path.append(a)
+            a = parent[a]
+        paths.append(path)
+    depth = max(1, max(len(path) for path in paths))
+    exit_paths = np.full((bay_count, depth), bay_count, dtype=np.intp)
+    for b, path in enumerate(paths):
+        exit_paths[b, :len(path)] = path
+    return exit_paths
+
+
+@dataclass(frozen=True)
+class CompiledProblem:
+    """
+    Immutable columnar view of the loaded depot and fleet
+    
+    Built once after loading data so the GA hot path works on NumPy columns
+    indexed by train/bay position instead of Train/DepotBay attribute lookups.
+    """
+    train_ids: Tuple[str, ...]
+    train_departure_times: Tuple[str, ...]
+    train_length: np.ndarray
+    train_priority: np.ndarray
+    train_readiness: np.ndarray  # index into READINESS_STATES
+    train_needs_cleaning: np.ndarray
+    train_departure: np.ndarray  # minutes since midnight
+    train_departure_rank: np.ndarray  # 1-based rank among distinct departure times
+    train_cleaning_deadline: np.ndarray  # departure on the overnight cleaning clock
+    bay_ids: Tuple[str, ...]
+    bay_capacity: np.ndarray
+    bay_cleaning_enabled: np.ndarray
+    bay_cleaning_ready: np.ndarray  # earliest end of an available slot (overnight clock)
+    bay_distance_to_exit: np.ndarray
+    bay_distance_rank: np.ndarray  # 1-based rank among distinct distances
+    departure_order: np.ndarray  # train indices sorted by departure
+    departure_groups: Tuple[Tuple[int, int], ...] = field(default=())  # slices of departure_order
+    # Order trains enter a lane, 0 first (deepest): by arrival time on the
+    # overnight clock when given, else latest departure first, the order a
+    # depot free to sequence its lanes would choose
+    train_arrival_rank: np.ndarray = field(default_factory=lambda: np.zeros(0, np.int64))
+    has_arrival_times: bool = False
+    # Feasible bays per train, concatenated: train t may use the sorted bay
+    # indices domain_bays[domain_offsets[t]:domain_offsets[t + 1]]
+    domain_bays: np.ndarray = field(default_factory=lambda: np.zeros(0, np.int32))
+    domain_offsets: np.ndarray = field(default_factory=lambda: np.zeros(1, np.int64))
+    # Interval index: available cleaning slots per bay, sorted by end time
+    # (overnight clock)
+    bay_slot_ends: Tuple[np.ndarray, ...] = field(default=())
+    bay_slot_starts: Tuple[np.ndarray, ...] = field(default=())
+    # The same index flattened for vectorized lookups: bay * SLOT_KEY_SPAN +
+    # end, sorted, bay b's slots starting at slot_offsets[b]
+    slot_keys: np.ndarray = field(default_factory=lambda: np.zeros(0, np.int64))
+    slot_offsets: np.ndarray = field(default_factory=lambda: np.zeros(1, np.int64))
+    has_cleaning_slots: bool = False  # False: cleaning_enabled alone decides
+    # Track graph: strict ancestors of each bay on its shortest path to the
+    # exit, padded with bay_count; no columns without a graph. A train in
+    # bay a must move for bay b to leave iff a is on row b
+    bay_exit_paths: np.ndarray = field(default_factory=lambda: np.zeros((0, 0), np.intp))
+    
+    @property
+    def has_track_graph(self) -> bool:
+        """Whether shunting is costed on the bay connection graph"""
+        return self.bay_exit_paths.shape[1] > 0
+    
+    def domain(self, train: int) -> np.ndarray:
+        """Feasible bay indices of a train, sorted (a view, not a copy)"""
+        return self.domain_bays[self.domain_offsets[train]:self.domain_offsets[train + 1]]
+    
+    def in_domain(self, train: int, bay: int) -> bool:
+        domain = self.domain(train)
+        k = int(np.searchsorted(domain, bay))
+        return k < len(domain) and domain[k] == bay
+    
+    def random_bay(self, train: int) -> int:
+        """A bay drawn uniformly from the train's domain"""
+        start, end = self.domain_offsets[train], self.domain_offsets[train + 1]
+        return int(self.domain_bays[start + random.randrange(end - start)])
+    
+    def exit_path(self, bay: int) -> List[int]:
+        """Bays between bay and the exit, nearest to the bay first"""
+        return [int(a) for a in self.bay_exit_paths[bay] if a < self.bay_count]
+
+    @property
+    def train_count(self) -> int:
+        return len(self.train_ids)
+
+    @property
+    def bay_count(self) -> int:
+        return len(self.bay_ids)
+
+    def cleaning_ok(self, train_idx, bay_idx) -> np.ndarray:
+        """
+        Whether each train's cleaning need is met in each bay (broadcastable)
+        
+        A train that needs cleaning must be parked in a cleaning bay with an
+        available slot that ends by its departure, compared on the overnight
+        clock: a 17:00-19:00 slot serves a 06:00 departure the next morning.
+        Checking the earliest slot end of the bay is enough for that, so this
+        is O(1) per gene.
+        
+        This checks one train on its own. A slot cleans one train, so trains
+        sharing a lane also compete for its slots (see slots_ready and
+        StablingOptimizer._lane_cleaning).
+        """
+        return (~self.train_needs_cleaning[train_idx]
+                | (self.bay_cleaning_ready[bay_idx] <= self.train_cleaning_deadline[train_idx]))
+    
+    def slots_ready(self, train_idx, bay_idx) -> np.ndarray:
+        """
+        Available slots in each bay that end by each train's departure
+        (broadcastable), by binary search in the flattened interval index
+        """
+        bay_idx = np.asarray(bay_idx)
+        keys = bay_idx * SLOT_KEY_SPAN + self.train_cleaning_deadline[train_idx]
+        return np.searchsorted(self.slot_keys, keys, side='right') - self.slot_offsets[bay_idx]
+    
+    def cleaning_slot(self, train: int, bay: int) -> Optional[Tuple[int, int]]:
+        """
+        (start, end) clock minutes of the latest slot in bay that ends by
+        train's departure, found by binary search in the bay's interval index
+        
+        For a train alone in its bay; see lane_cleaning_slots for a lane.
+        """
+        if not self.bay_cleaning_enabled[bay]:
+            return None
+        ends = self.bay_slot_ends[bay]
+        k = bisect.bisect_right(ends, int(self.train_cleaning_deadline[train])) - 1
+        if k < 0:
+            return None
+        return self._slot_clock(bay, k)
+    
+    def lane_cleaning_slots(self, bay: int, trains: List[int]) -> Dict[int, Tuple[int, int]]:
+        """
+        A different slot of bay for each of trains, as (start, end) clock minutes
+        
+        Latest departures first, each train takes the latest free slot that
+        ends by its departure, so trains keep slots close to departure while
+        earlier departures still find one. Trains left without a slot are
+        missing from the result; none are when trains is a set that
+        StablingOptimizer._lane_cleaning lets keep their slots.
+        """
+        ends = self.bay_slot_ends[bay].tolist()
+        free = list(range(len(ends)))  # slot positions, by end time
+        slots = {}
+        for i in sorted(trains, key=lambda t: -self.train_cleaning_deadline[t]):
+            k = bisect.bisect_right(ends, int(self.train_cleaning_deadline[i]))
+            k = bisect.bisect_left(free, k) - 1
+            if k >= 0:
+                slots[i] = self._slot_clock(bay, free.pop(k))
+        return slots
+    
+    def _slot_clock(self, bay: int, k: int) -> Tuple[int, int]:
+        day = 24 * 60
+        return int(self.bay_slot_starts[bay][k]) % day, int(self.bay_slot_ends[bay][k]) % day
+    
+    @classmethod
+    def build(cls, depot_bays: Dict[str, DepotBay], trains: List[Train],
+              cleaning_slots: List[CleaningSlot] = ()) -> "CompiledProblem":
+        """
+        Compile bay and train objects into columns
+        
+        With cleaning slots, a cleaning bay only serves trains departing after
+        one of its available slots ends, on the overnight clock (see
+        STABLING_DAY_START). Without any, cleaning_enabled alone decides, as if
+        every cleaning bay could clean at any time.
+        """
+        bays = list(depot_bays.values())
+        departures = np.array([train.departure_minutes for train in trains], dtype=np.int64)
+        deadlines = _overnight_minutes(departures)
+        distances = np.array([bay.distance_to_exit for bay in bays], dtype=np.int64)
+        
+        order = np.argsort(departures, kind='stable')
+        _, starts = np.unique(departures[order], return_index=True)
+        bounds = list(starts[1:]) + [len(trains)]
+        
+        arrivals = [train.arrival_minutes for train in trains]
+        has_arrivals = any(arrival is not None for arrival in arrivals)
+        if has_arrivals and None in arrivals:
+            raise ValueError("arrival_time must be given for every train or for none")
+        entry_order = np.argsort(_overnight_minutes(np.array(arrivals, dtype=np.int64))
+                                 if has_arrivals else -departures, kind='stable')
+        arrival_rank = np.empty(len(trains), dtype=np.int64)
+        arrival_rank[entry_order] = np.arange(len(trains))
+        
+        exit_paths = _track_graph(bays)
+        
+        # Per-bay interval index over the available cleaning slots
+        slots_by_bay: Dict[str, List[Tuple[int, int]]] = {bay.id: [] for bay in bays}
+        for slot in cleaning_slots:
+            if slot.available and slot.bay_id in slots_by_bay:
+                # A slot falls on the day of its start
+                start = int(_overnight_minutes(slot.start_minutes))
+                end = start + slot.end_minutes - slot.start_minutes
+                slots_by_bay[slot.bay_id].append((end, start))
+        slot_ends, slot_starts, slot_keys, ready = [], [], [], []
+        for b, bay in enumerate(bays):
+            intervals = sorted(slots_by_bay[bay.id])
+            slot_ends.append(_frozen([end for end, _ in intervals], np.int64))
+            slot_keys += [b * SLOT_KEY_SPAN + end for end, _ in intervals]
+            slot_starts.append(_frozen([start for _, start in intervals], np.int64))
+            if not bay.cleaning_enabled:
+                ready.append(NO_CLEANING)
+            elif not cleaning_slots:
+                ready.append(0)
+            else:
+                ready.append(intervals[0][0] if intervals else NO_CLEANING)
+        cleaning_ready = np.array(ready, dtype=np.int64)
+        
+        # Domain reduction: bays each train physically fits, narrowed to
+        # bays that can clean it in time when it needs cleaning. A train with
+        # no such bay keeps the widest non-empty set so it can still be placed
+        capacities = np.array([bay.capacity for bay in bays])
+        all_bays = np.arange(len(bays))
+        domains = []
+        for train in trains:
+            fits = train.length <= capacities
+            if train.needs_cleaning:
+                compatible = fits & (cleaning_ready <= _overnight_minutes(train.departure_minutes))
+            else:
+                compatible = fits
+            domain = all_bays[compatible] if compatible.any() else all_bays[fits]
+            domains.append(domain if len(domain) else all_bays)
+        domain_offsets = np.zeros(len(trains) + 1, np.int64)
+        domain_offsets[1:] = np.cumsum([len(domain) for domain in domains])
+        
+        return cls(
+            train_ids=tuple(train.id for train in trains),
+            train_departure_times=tuple(train.departure_time for train in trains),
+            train_length=_frozen([train.length for train in trains], np.int64),
+            train_priority=_frozen([train.priority for train in trains], np.int64),
+            train_readiness=_frozen([READINESS_STATES.index(train.readiness) for train in trains],
+                                    np.int64),
+            train_needs_cleaning=_frozen([train.needs_cleaning for train in trains], bool),
+            train_departure=_frozen(departures, np.int64),
+            train_departure_rank=_frozen(np.unique(departures, return_inverse=True)[1] + 1,
+                                         np.int64),
+            train_cleaning_deadline=_frozen(deadlines, np.int64),
+            bay_ids=tuple(bay.id for bay in bays),
+            bay_capacity=_frozen([bay.capacity for bay in bays], np.int64),
+            bay_cleaning_enabled=_frozen([bay.cleaning_enabled for bay in bays], bool),
+            bay_cleaning_ready=_frozen(cleaning_ready, np.int64),
+            bay_distance_to_exit=_frozen(distances, np.int64),
+            bay_distance_rank=_frozen(np.unique(distances, return_inverse=True)[1] + 1, np.int64),
+            departure_order=_frozen(order, np.intp),
+            departure_groups=tuple((int(a), int(b)) for a, b in zip(starts, bounds)),
+            train_arrival_rank=_frozen(arrival_rank, np.int64),
+            has_arrival_times=has_arrivals,
+            domain_bays=_frozen(np.concatenate(domains) if domains else [], np.int32),
+            domain_offsets=_frozen(domain_offsets, np.int64),
+            bay_slot_ends=tuple(slot_ends),
+            bay_slot_starts=tuple(slot_starts),
+            slot_keys=_frozen(slot_keys, np.int64),
+            slot_offsets=_frozen(np.cumsum([0] + [len(ends) for ends in slot_ends]), np.int64),
+            has_cleaning_slots=bool(cleaning_slots),
+            bay_exit_paths=_frozen(exit_paths, np.intp),
+        )
+
+
+class FitnessCache:
+    """
+    Bounded LRU cache of fitness values keyed by a compact genome hash
+    
+    Once the population converges, crossover and mutation keep producing
+    genomes that were already scored; those are served from here.
+    """
+    
+    def __init__(self, max_size: int):
+        if max_size <= 0:
+            raise ValueError("Fitness cache size must be positive")
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[bytes, float]" = OrderedDict()
+    
+    @staticmethod
+    def genome_key(genome: np.ndarray) -> bytes:
+        """16-byte digest of a genome's bay indices"""
+        return hashlib.blake2b(np.ascontiguousarray(genome, dtype=np.int32).tobytes(),
+                               digest_size=16).digest()
+    
+    def get(self, key: bytes) -> Optional[float]:
+        """Return the cached fitness and mark it most recently used"""
+        score = self._entries.get(key)
+        if score is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return score
+    
+    def put(self, key: bytes, score: float) -> None:
+        """Store a fitness, evicting the least recently used entries over the bound"""
+        self._entries[key] = score
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def stats(self) -> Dict:
+        """Counters reported in the optimization statistics"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxSize": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+class IncrementalEvaluator:
+    """
+    Delta fitness evaluation for single-gene moves
+    
+    Keeps, for one genome, its per-gene scores, per-bay occupancy and a 2-D
+    Fenwick tree of (departure rank, distance rank) for the trains parked.
+    Moving a train then updates the score in O(log T * log D) instead of
+    rescoring the whole assignment, where T and D are the numbers of distinct
+    departure times and bay distances.
+    
+    With a track graph the distance tree is replaced by sparse per-bay Fenwick
+    trees over departure rank: one for the trains parked in the bay and one
+    for the bay together with every bay whose exit path runs through it.
+    A move then costs O(depth * log T), depth being the longest exit path.
+    
+    In "lane" capacity mode it also keeps each lane's trains and the score
+    change from its spilled trains and from those left without a cleaning
+    slot, so the lane checks of a move cost O(k log k) for the k trains in
+    the two lanes.
+    """
+    
+    def __init__(self, optimizer: "StablingOptimizer", genome: List[int]):
+        self.optimizer = optimizer
+        self.problem = problem = optimizer.problem
+        self.genes = [int(g) for g in genome]
+        if len(self.genes) != problem.train_count:
+            raise ValueError(f"Genome must have {problem.train_count} genes")
+        
+        weights = optimizer._fitness_weights
+        self._overcrowding = weights['overcrowding_penalty']
+        self._violation = weights['constraint_violation']
+        self._cleaning_mismatch = weights['cleaning_mismatch']
+        self._lane_blocking = weights['lane_blocking_penalty']
+        self._shunting = weights['shunting_penalty']
+        self._departure_rank = problem.train_departure_rank.tolist()
+        self._distance_rank = problem.bay_distance_rank.tolist()
+        self._rows = int(problem.train_departure_rank.max())
+        self._cols = int(problem.bay_distance_rank.max())
+        
+        genes = np.array(self.genes, dtype=np.intp)
+        self.gene_scores = optimizer._gene_scores(np.arange(len(genes)), genes).tolist()
+        self.bay_usage = np.bincount(genes, minlength=problem.bay_count).tolist()
+        self._lane_mode = optimizer._capacity_mode == "lane"
+        if self._lane_mode:
+            self._departures = problem.train_departure.tolist()
+            self._arrival_ranks = problem.train_arrival_rank.tolist()
+            self._lengths = problem.train_length.tolist()
+            self._capacities = problem.bay_capacity.tolist()
+            self._previous = (optimizer._previous_bays.tolist()
+                              if optimizer._previous_bays is not None else None)
+            self._relocation = optimizer._relocation_penalty
+            self._cleaning_slots = problem.has_cleaning_slots
+            self._needs_cleaning = problem.train_needs_cleaning.tolist()
+            self._cleaning_ready = problem.bay_cleaning_ready.tolist()
+            self._deadlines = problem.train_cleaning_deadline.tolist()
+            self._lanes = [set() for _ in range(problem.bay_count)]
+            for i, bay in enumerate(self.genes):
+                self._lanes[bay].add(i)
+            self._lane_adjust = [self._lane_adjustment(b) for b in range(problem.bay_count)]
+        self._graph = problem.has_track_graph
+        if self._graph:
+            self._exit_paths = [problem.exit_path(b) for b in range(problem.bay_count)]
+            self._own = [{} for _ in range(problem.bay_count)]
+            self._subtree = [{} for _ in range(problem.bay_count)]
+            self._own_total = [0] * problem.bay_count
+            for i, bay in enumerate(self.genes):
+                self._park(i, bay, 1)
+        else:
+            self._tree = [[0] * (self._cols + 1) for _ in range(self._rows + 1)]
+            for i, bay in enumerate(self.genes):
+                self._update(self._departure_rank[i], self._distance_rank[bay], 1)
+        
+        self.raw_score = float(optimizer.evaluate_population(genes[None, :])[0])
+    
+    @property
+    def score(self) -> float:
+        """Fitness of the current genome, as evaluate_population scores it"""
+        return self.raw_score
+    
+    def _update(self, row: int, col: int, amount: int) -> None:
+        r = row
+        while r <= self._rows:
+            c = col
+            tree_row = self._tree[r]
+            while c <= self._cols:
+                tree_row[c] += amount
+                c += c & -c
+            r += r & -r
+    
+    def _prefix(self, row: int, col: int) -> int:
+        """Trains with departure rank <= row and distance rank <= col"""
+        total = 0
+        r = row
+        while r > 0:
+            c = col
+            tree_row = self._tree[r]
+            while c > 0:
+                total += tree_row[c]
+                c -= c & -c
+            r -= r & -r
+        return total
+    
+    def _shunting_pairs(self, train: int, col: int) -> int:
+        """Shunting pairs train would form if parked at distance rank col"""
+        row = self._departure_rank[train]
+        # Later departures parked nearer the exit
+        later_nearer = self._prefix(self._rows, col - 1) - self._prefix(row, col - 1)
+        # Earlier departures parked further from the exit
+        earlier_further = self._prefix(row - 1, self._cols) - self._prefix(row - 1, col)
+        return later_nearer + earlier_further
+    
+    def _tree_add(self, tree: Dict[int, int], row: int, amount: int) -> None:
+        while row <= self._rows:
+            tree[row] = tree.get(row, 0) + amount
+            row += row & -row
+    
+    def _tree_prefix(self, tree: Dict[int, int], row: int) -> int:
+        total = 0
+        while row > 0:
+            total += tree.get(row, 0)
+            row -= row & -row
+        return total
+    
+    def _park(self, train: int, bay: int, amount: int) -> None:
+        """Add (amount 1) or remove (amount -1) train from bay's graph trees"""
+        row = self._departure_rank[train]
+        self._tree_add(self._own[bay], row, amount)
+        self._own_total[bay] += amount
+        self._tree_add(self._subtree[bay], row, amount)
+        for ahead in self._exit_paths[bay]:
+            self._tree_add(self._subtree[ahead], row, amount)
+    
+    def _graph_pairs(self, train: int, bay: int) -> int:
+        """Blocking pairs train would form if parked in bay on the track graph"""
+        row = self._departure_rank[train]
+        # Later departures parked on this train's exit path
+        later_ahead = sum(self._own_total[ahead] - self._tree_prefix(self._own[ahead], row)
+                          for ahead in self._exit_paths[bay])
+        # Earlier departures whose exit path runs through this bay
+        earlier_behind = (self._tree_prefix(self._subtree[bay], row - 1)
+                          - self._tree_prefix(self._own[bay], row - 1))
+        return later_ahead + earlier_behind
+    
+    def _lane_pairs(self, train: int, bay: int) -> int:
+        """LIFO-blocked pairs train forms with the other trains in lane bay"""
+        departure, rank = self._departures[train], self._arrival_ranks[train]
+        return sum(1 for other in self._lanes[bay] if other != train and (
+            self._departures[other] < departure if self._arrival_ranks[other] < rank
+            else departure < self._departures[other]))
+    
+    def _relocation_cost(self, train: int, bay: int) -> float:
+        if self._previous is not None and 0 <= self._previous[train] != bay:
+            return self._relocation
+        return 0.0
+    
+    def _lane_adjustment(self, bay: int) -> float:
+        """
+        Score change from masking the trains that spill out of lane bay or
+        get none of its cleaning slots
+        
+        Each spilled train scores constraint_violation, each train without a
+        slot (see StablingOptimizer._unserved_cleaning) cleaning_mismatch, plus
+        any relocation penalty, instead of its gene score, as in _gene_scores.
+        """
+        capacity = self._capacities[bay]
+        filled = 0
+        adjustment = 0.0
+        wanting = []
+        for train in sorted(self._lanes[bay], key=self._arrival_ranks.__getitem__):
+            filled += self._lengths[train]
+            if self._lengths[train] > capacity:
+                continue
+            if filled > capacity:
+                adjustment += (self._violation - self._relocation_cost(train, bay)
+                               - self.gene_scores[train])
+            elif (self._cleaning_slots and self._needs_cleaning[train]
+                  and self._cleaning_ready[bay] <= self._deadlines[train]):
+                wanting.append(train)
+        if wanting:
+            for train in self.optimizer._unserved_cleaning(bay, wanting):
+                adjustment += (self._cleaning_mismatch - self._relocation_cost(train, bay)
+                               - self.gene_scores[train])
+        return adjustment
+    
+    def _lane_delta(self, train: int, old_bay: int, bay: int) -> float:
+        """
+        Change of the lane terms when train leaves old_bay for bay
+        
+        Called once train's gene score is already the one for bay.
+        """
+        blocked = self._lane_pairs(train, bay) - self._lane_pairs(train, old_bay)
+        before = self._lane_adjust[old_bay] + self._lane_adjust[bay]
+        self._lanes[old_bay].discard(train)
+        self._lanes[bay].add(train)
+        self._lane_adjust[old_bay] = self._lane_adjustment(old_bay)
+        self._lane_adjust[bay] = self._lane_adjustment(bay)
+        after = self._lane_adjust[old_bay] + self._lane_adjust[bay]
+        return after - before + blocked * self._lane_blocking
+    
+    def move(self, train: int, bay: int) -> float:
+        """Park train in bay, update the score and return the new fitness"""
+        old_bay = self.genes[train]
+        if bay == old_bay:
+            return self.score
+        
+        row = self._departure_rank[train]
+        old_col, new_col = self._distance_rank[old_bay], self._distance_rank[bay]
+        delta = 0.0
+        
+        if self._graph:
+            old_pairs = self._graph_pairs(train, old_bay)
+            self._park(train, old_bay, -1)
+            delta += (self._graph_pairs(train, bay) - old_pairs) * self._shunting
+            self._park(train, bay, 1)
+        elif old_col != new_col:
+            delta += (self._shunting_pairs(train, new_col)
+                      - self._shunting_pairs(train, old_col)) * self._shunting
+            self._update(row, old_col, -1)
+            self._update(row, new_col, 1)
+        
+        new_gene_score = float(self.optimizer._gene_scores(train, bay))
+        delta += new_gene_score - self.gene_scores[train]
+        self.gene_scores[train] = new_gene_score
+        
+        if self._lane_mode:
+            delta += self._lane_delta(train, old_bay, bay)
+        else:
+            if self.bay_usage[old_bay] > 1:
+                delta -= self._overcrowding
+            if self.bay_usage[bay] > 0:
+                delta += self._overcrowding
+        self.bay_usage[old_bay] -= 1
+        self.bay_usage[bay] += 1
+        
+        self.genes[train] = bay
+        self.raw_score += delta
+        return self.score
+    
+    def apply(self, changes: Dict[int, int]) -> float:
+        """Apply several moves {train: bay} and return the new fitness"""
+        for train, bay in changes.items():
+            self.move(train, bay)
+        return self.score
+    
+    def evaluate_changes(self, changes: Dict[int, int]) -> float:
+        """Fitness the genome would have after the moves, leaving it unchanged"""
+        previous = {train: self.genes[train] for train in changes}
+        score = self.apply(changes)
+        self.apply(previous)
+        return score
+    
+    def swap(self, first: int, second: int) -> float:
+        """Exchange the bays of two trains and return the new fitness"""
+        return self.apply({first: self.genes[second], second: self.genes[first]})
+
+
+# Optimizer copy installed in each evaluation worker process by _init_worker
+_WORKER_OPTIMIZER: Optional["StablingOptimizer"] = None
+# Run whose island epochs the worker's fitness cache currently serves
+_WORKER_CACHE_RUN: Optional[str] = None
+
+
+def _init_worker(worker_optimizer: "StablingOptimizer") -> None:
+    """Pool initializer: keep the compiled problem for the life of the worker"""
+    global _WORKER_OPTIMIZER
+    # A forked copy still carries the parent's pool and run settings
+    worker_optimizer.__dict__.update(worker_optimizer.__getstate__())
+    _WORKER_OPTIMIZER = worker_optimizer
+
+
+def _evaluate_chunk(genomes: np.ndarray) -> np.ndarray:
+    """Score one chunk of a population inside a worker process"""
+    return _WORKER_OPTIMIZER.evaluate_population(genomes)
+
+
+def _run_island_epoch(task: Tuple) -> Tuple[List[List[int]], List[float], List[Dict], Tuple,
+                                            str, Optional[Tuple]]:
+    """
+    Evolve one island for a number of generations inside a worker process
+    
+    Individuals travel as plain (genome, fitness) lists so DEAP's creator
+    classes never need to be pickled. With a cache size, the worker keeps its
+    own fitness cache for the rest of the run (cache_run) and reports
+    (pid, hits, misses, size) for the epoch.
+    """
+    global _WORKER_CACHE_RUN
+    (genomes, fitnesses, ngen, cxpb, mutpb, seed, encoding, deadline, local_search,
+     cache_size, cache_run) = task
+    worker = _WORKER_OPTIMIZER
+    if worker.toolbox is None or worker._encoding != encoding:
+        worker.setup_genetic_algorithm(encoding)
+    if cache_size <= 0:
+        worker._fitness_cache = None
+    elif worker._fitness_cache is None or _WORKER_CACHE_RUN != cache_run:
+        # Scores depend on the run's weights and settings: start each run empty
+        worker._fitness_cache = FitnessCache(cache_size)
+    _WORKER_CACHE_RUN = cache_run
+    cache = worker._fitness_cache
+    hits, misses = (cache.hits, cache.misses) if cache else (0, 0)
+    random.seed(seed)
+    
+    population = []
+    for genome, fitness in zip(genomes, fitnesses):
+        ind = creator.Individual(genome)
+        if fitness is not None:
+            ind.fitness.values = (fitness,)
+        population.append(ind)
+    
+    hall_of_fame = tools.HallOfFame(1)
+    population, logbook, stop_reason = worker._evolve(
+        population, cxpb, mutpb, ngen, _fitness_statistics(), hall_of_fame, deadline=deadline,
+        local_search=local_search)
+    return ([list(ind) for ind in population],
+            [ind.fitness.values[0] for ind in population],
+            list(logbook),
+            (list(hall_of_fame[0]), hall_of_fame[0].fitness.values[0]),
+            stop_reason,
+            (os.getpid(), cache.hits - hits, cache.misses - misses, len(cache)) if cache else None)
+
+
+# DEAP's creator classes are process-wide and shared by every optimizer, so
+# they are created once here rather than per setup_genetic_algorithm call
+if not hasattr(creator, "FitnessMax"):
+    creator.create("FitnessMax", base.Fitness, weights=(1.0,))
+if not hasattr(creator, "Individual"):
+    creator.create("Individual", list, fitness=creator.FitnessMax)
+
+
+def _fitness_statistics() -> tools.Statistics:
+    """Per-generation fitness statistics recorded in the logbook"""
+    stats = tools.Statistics(lambda ind: ind.fitness.values)
+    stats.register("avg", np.mean)
+    stats.register("min", np.min)
+    stats.register("max", np.max)
+    return stats
+
 
 class StablingOptimizer:
     """
@@ -94,6 +941,22 @@ class StablingOptimizer:
         self.trains: List[Train] = []
         self.cleaning_slots: List[CleaningSlot] = []
         self.toolbox = None
+        self._encoding = "assignment"
+        self._problem: Optional[CompiledProblem] = None
+        self._fingerprint: Optional[str] = None
+        self._fitness_cache: Optional[FitnessCache] = None
+        self._workers = 1
+        self._pool = None
+        self._pool_workers = 0
+        self._pool_problem: Optional[CompiledProblem] = None
+        # Previous plan as a bay index per train (-1 if unknown) and the
+        # fitness penalty for moving a train away from it
+        self._previous_bays: Optional[np.ndarray] = None
+        self._previous_plan_size = 0  # trains listed in the plan, known or not
+        self._relocation_penalty = 0.0
+        self._capacity_mode = "single"
+        self.load_seconds: Dict[str, float] = {}  # duration of the last load_* per file
+        self.state_file: Optional[str] = None  # stabling state CSV for previous_plan="state"
         self._fitness_weights = {
             'constraint_violation': -100,  # Heavy penalty for constraint violations
             'cleaning_mismatch': -50,      # Penalty for cleaning requirement mismatch
@@ -101,26 +964,31 @@ class StablingOptimizer:
             'priority_bonus': 2,           # Bonus multiplier for high priority trains
             'readiness_bonus': 5,          # Bonus for ready trains
             'overcrowding_penalty': -20,   # Penalty per extra train in bay
-            'shunting_penalty': -1         # Penalty per estimated shunting move
+            'shunting_penalty': -1,        # Penalty per estimated shunting move
+            'lane_blocking_penalty': -30   # Penalty per LIFO-blocked train pair in a lane
         }
     
+    def __getstate__(self) -> Dict:
+        """Pickle only the data and compiled problem, never pools or toolboxes"""
+        state = self.__dict__.copy()
+        state.update(toolbox=None, _fitness_cache=None, _workers=1,
+                     _pool=None, _pool_workers=0, _pool_problem=None)
+        return state
+    
     def load_depot_layout(self, filepath: str) -> None:
         """Load depot layout configuration from JSON file"""
+        started = time.perf_counter()
         try:
             with open(filepath, 'r', encoding='utf-8') as f:
                 data = json.load(f)
                 
             self.depot_bays.clear()
+            self._invalidate_problem()
             for bay_data in data['bays']:
-                bay = DepotBay(
-                    id=bay_data['id'],
-                    capacity=bay_data['capacity'],
-                    cleaning_enabled=bay_data['cleaning_enabled'],
-                    distance_to_exit=bay_data['distance_to_exit'],
-                    connections=bay_data.get('connections', [])
-                )
+                bay = _parse_bay(bay_data)
                 self.depot_bays[bay.id] = bay
                 
+            self.load_seconds["depot_layout"] = time.perf_counter() - started
             print(f"✅ Loaded {len(self.depot_bays)} depot bays")
             
         except FileNotFoundError:
@@ -134,24 +1002,19 @@ class StablingOptimizer:
     
     def load_trains(self, filepath: str) -> None:
         """Load train data from CSV file"""
+        started = time.perf_counter()
         try:
             self.trains.clear()
+            self._invalidate_problem()
             with open(filepath, 'r', encoding='utf-8') as f:
                 reader = csv.DictReader(f)
                 for row_num, row in enumerate(reader, 1):
                     try:
-                        train = Train(
-                            id=row['train_id'],
-                            length=int(row['length']),
-                            needs_cleaning=row['needs_cleaning'].lower() == 'true',
-                            departure_time=row['departure_time'],
-                            readiness=row['readiness'],
-                            priority=int(row['priority'])
-                        )
-                        self.trains.append(train)
+                        self.trains.append(_parse_train(row))
                     except (ValueError, KeyError) as e:
                         raise ValueError(f"Error in row {row_num}: {e}")
                         
+            self.load_seconds["trains"] = time.perf_counter() - started
             print(f"✅ Loaded {len(self.trains)} trains")
             
         except FileNotFoundError:
@@ -161,22 +1024,19 @@ class StablingOptimizer:
     
     def load_cleaning_slots(self, filepath: str) -> None:
         """Load cleaning schedule from CSV file"""
+        started = time.perf_counter()
         try:
             self.cleaning_slots.clear()
+            self._invalidate_problem()
             with open(filepath, 'r', encoding='utf-8') as f:
                 reader = csv.DictReader(f)
                 for row_num, row in enumerate(reader, 1):
                     try:
-                        slot = CleaningSlot(
-                            bay_id=row['bay_id'],
-                            start_time=row['start_time'],
-                            end_time=row['end_time'],
-                            available=row['available'].lower() == 'true'
-                        )
-                        self.cleaning_slots.append(slot)
+                        self.cleaning_slots.append(_parse_cleaning_slot(row))
                     except (ValueError, KeyError) as e:
                         raise ValueError(f"Error in row {row_num}: {e}")
                         
+            self.load_seconds["cleaning_slots"] = time.perf_counter() - started
             print(f"✅ Loaded {len(self.cleaning_slots)} cleaning slots")
             
         except FileNotFoundError:
@@ -184,35 +1044,249 @@ class StablingOptimizer:
         except Exception as e:
             raise Exception(f"Error loading cleaning slots: {e}")
     
-    def setup_genetic_algorithm(self) -> None:
-        """Initialize DEAP genetic algorithm components"""
-        if not self.trains or not self.depot_bays:
-            raise ValueError("Cannot setup GA: no trains or bays loaded")
+    def load_payload(self, payload: Dict) -> None:
+        """
+        Load bays, trains and cleaning slots from an inline problem payload
         
-        # Clear any existing fitness/individual classes
-        if hasattr(creator, "FitnessMax"):
-            del creator.FitnessMax
-        if hasattr(creator, "Individual"):
-            del creator.Individual
+        payload = {"bays": [...], "trains": [...], "cleaning_slots": [...]}
+        with the fields of depot_layout.json bays and of rakes.csv and
+        cleaning_slots.csv rows; cleaning_slots is optional. Replaces all
+        loaded data.
+        """
+        started = time.perf_counter()
+        if not isinstance(payload, dict):
+            raise ValueError("Problem payload must be an object")
+        sections = (("bays", _parse_bay), ("trains", _parse_train),
+                    ("cleaning_slots", _parse_cleaning_slot))
+        parsed = {}
+        for name, parse in sections:
+            records = payload.get(name, [] if name == "cleaning_slots" else None)
+            if not isinstance(records, list):
+                raise ValueError(f"Problem payload needs a '{name}' list")
+            try:
+                parsed[name] = [parse(record) for record in records]
+            except (ValueError, KeyError, TypeError, AttributeError) as e:
+                raise ValueError(f"Invalid record in problem {name}: {e}")
+        
+        self._invalidate_problem()
+        self.depot_bays = {bay.id: bay for bay in parsed["bays"]}
+        self.trains = parsed["trains"]
+        self.cleaning_slots = parsed["cleaning_slots"]
+        self.load_seconds["payload"] = time.perf_counter() - started
+    
+    @classmethod
+    def from_payload(cls, payload: Dict) -> "StablingOptimizer":
+        """A separate optimizer holding an inline problem, compiled and ready to solve"""
+        instance = cls()
+        instance.load_payload(payload)
+        if not instance.trains or not instance.depot_bays:
+            raise ValueError("Problem payload needs at least one bay and one train")
+        instance.compile_problem()
+        return instance
+    
+    def load_stabling_state(self, filepath: str) -> Dict[str, str]:
+        """Load where each train is currently parked, as {train_id: bay_id}"""
+        try:
+            state = {}
+            with open(filepath, 'r', encoding='utf-8') as f:
+                reader = csv.DictReader(f)
+                for row_num, row in enumerate(reader, 1):
+                    try:
+                        if row['status'].strip().lower() == 'parked' and row['bay'].strip():
+                            state[row['train_id'].strip()] = row['bay'].strip()
+                    except (AttributeError, KeyError) as e:
+                        raise ValueError(f"Error in row {row_num}: {e}")
             
-        # Create fitness and individual classes
-        creator.create("FitnessMax", base.Fitness, weights=(1.0,))
-        creator.create("Individual", list, fitness=creator.FitnessMax)
+            print(f"✅ Loaded stabling state for {len(state)} parked trains")
+            return state
+            
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Stabling state file not found: {filepath}")
+        except Exception as e:
+            raise Exception(f"Error loading stabling state: {e}")
+    
+    def set_previous_plan(self, plan: Optional[Dict[str, str]],
+                          relocation_penalty: float = 0.0) -> int:
+        """
+        Anchor runs to a previous plan {train_id: bay_id}
+        
+        The plan seeds the GA, hints CP-SAT and is the starting point of
+        reoptimize(). With a relocation_penalty, every train parked somewhere
+        other than its previous bay costs that much fitness, which keeps
+        replans stable. Trains or bays the loaded data does not know are
+        ignored; a plan that places no known train is dropped altogether.
+        Returns the number of trains the plan places.
+        """
+        previous = self.match_previous_plan(plan) if plan else None
+        if previous is not None and not (previous >= 0).any():
+            previous = None
+        
+        penalty = float(relocation_penalty) if previous is not None else 0.0
+        unchanged = (penalty == self._relocation_penalty
+                     and (previous is None) == (self._previous_bays is None)
+                     and (previous is None or np.array_equal(previous, self._previous_bays)))
+        if not unchanged:
+            # Worker copies score with the old anchor
+            self.close_pool()
+        self._previous_bays = previous
+        self._previous_plan_size = len(plan) if plan else 0
+        self._relocation_penalty = penalty
+        return 0 if previous is None else int(np.count_nonzero(previous >= 0))
+    
+    def match_previous_plan(self, plan: Dict[str, str]) -> np.ndarray:
+        """Previous bay index of every loaded train under plan, -1 where it places none"""
+        problem = self.problem
+        bay_index = {bay_id: b for b, bay_id in enumerate(problem.bay_ids)}
+        return np.array([bay_index.get(plan.get(train_id), -1)
+                         for train_id in problem.train_ids], dtype=np.intp)
+    
+    def set_capacity_mode(self, mode: str) -> None:
+        """
+        Choose how bay capacity is modelled
+        
+        "single" parks one train per bay and penalises every extra train
+        (overcrowding_penalty). "lane" treats each bay as a dead-end lane whose
+        capacity is its length in metres: trains are packed nose-to-tail in
+        arrival order, every train that no longer fits behind the ones before
+        it scores like a train too long for its bay, and a later arrival that
+        departs after an earlier one in the same lane blocks it
+        (lane_blocking_penalty per pair). Arrivals follow the trains'
+        arrival_time; without one the lane order is free and taken latest
+        departure first, so only arrival times can force blocking (see
+        CompiledProblem.train_arrival_rank).
+        """
+        if mode not in CAPACITY_MODES:
+            raise ValueError(f"Unknown capacity mode: {mode}")
+        if mode != self._capacity_mode:
+            # Worker copies score with the old mode
+            self.close_pool()
+        self._capacity_mode = mode
+    
+    def previous_genome(self) -> Optional[List[int]]:
+        """The previous plan as a genome, with unplaced trains filled in greedily"""
+        if self._previous_bays is None:
+            return None
+        greedy = self.greedy_assignment()
+        return [int(b) if b >= 0 else greedy[i] for i, b in enumerate(self._previous_bays)]
+    
+    def _invalidate_problem(self) -> None:
+        """Drop compiled state derived from the loaded data"""
+        self._problem = None
+        self._fingerprint = None
+        self._previous_bays = None
+        self._previous_plan_size = 0
+        self._relocation_penalty = 0.0
+        self.toolbox = None
+        self.close_pool()
+    
+    def compile_problem(self) -> CompiledProblem:
+        """Compile loaded bays and trains into immutable NumPy columns"""
+        if not self.trains or not self.depot_bays:
+            raise ValueError("Cannot compile problem: no trains or bays loaded")
+        self._problem = CompiledProblem.build(self.depot_bays, self.trains, self.cleaning_slots)
+        return self._problem
+    
+    def data_fingerprint(self) -> str:
+        """Content hash of the loaded bays, trains and cleaning slots"""
+        if self._fingerprint is None:
+            payload = json.dumps({
+                "bays": [asdict(bay) for bay in self.depot_bays.values()],
+                "trains": [asdict(train) for train in self.trains],
+                "cleaning_slots": [asdict(slot) for slot in self.cleaning_slots]
+            }, sort_keys=True)
+            self._fingerprint = hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+        return self._fingerprint
+    
+    @property
+    def problem(self) -> CompiledProblem:
+        """Compiled problem for the loaded data, compiled on first use"""
+        if self._problem is None:
+            self.compile_problem()
+        return self._problem
+    
+    def _get_pool(self, workers: int):
+        """
+        Persistent process pool for parallel evaluation
+        
+        Workers receive this optimizer (and its compiled arrays) once, through
+        fork inheritance where available or a single pickle per worker
+        otherwise. The pool is reused across runs until the worker count or
+        the loaded data changes.
+        """
+        problem = self.problem
+        if self._pool is not None and self._pool_workers == workers \
+                and self._pool_problem is problem:
+            return self._pool
+        
+        self.close_pool()
+        if "fork" in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context("fork")
+        else:
+            context = multiprocessing.get_context()
+        self._pool = context.Pool(processes=workers, initializer=_init_worker, initargs=(self,))
+        self._pool_workers = workers
+        self._pool_problem = problem
+        return self._pool
+    
+    def close_pool(self) -> None:
+        """Shut down the evaluation worker pool, if one is running"""
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+        self._pool = None
+        self._pool_workers = 0
+        self._pool_problem = None
+    
+    def _score_genomes(self, genomes: np.ndarray) -> np.ndarray:
+        """Evaluate a batch locally or split into one chunk per pool worker"""
+        if self._workers <= 1 or len(genomes) < 2 * self._workers:
+            return self.evaluate_population(genomes)
+        pool = self._get_pool(self._workers)
+        chunks = np.array_split(genomes, self._workers)
+        return np.concatenate(pool.map(_evaluate_chunk, chunks, chunksize=1))
+    
+    def setup_genetic_algorithm(self, encoding: str = "assignment") -> None:
+        """
+        Initialize DEAP genetic algorithm components
+        
+        Args:
+            encoding: "assignment" - gene i is the bay index of train i;
+                      "permutation" - an individual is a permutation of bay
+                      slots, see _decode_genomes
+        """
+        if not self.trains or not self.depot_bays:
+            raise ValueError("Cannot setup GA: no trains or bays loaded")
+        if encoding not in GENOME_ENCODINGS:
+            raise ValueError(f"Unknown genome encoding: {encoding}")
         
         self.toolbox = base.Toolbox()
+        self._encoding = encoding
         
         # Define genetic operators
-        bay_count = len(self.depot_bays)
+        problem = self.problem
         
         def create_individual():
-            """Create random individual (bay assignment for each train)"""
-            return [random.randint(0, bay_count - 1) for _ in range(len(self.trains))]
+            """Create random individual (a feasible bay for each train where one exists)"""
+            return [problem.random_bay(train) for train in range(problem.train_count)]
+        
+        def create_permutation():
+            """Create random individual (a shuffled order of all bay slots)"""
+            return random.sample(range(self._slot_count()), self._slot_count())
         
-        self.toolbox.register("individual", tools.initIterate, creator.Individual, create_individual)
+        if encoding == "permutation":
+            # PMX keeps offspring valid permutations, and swap mutation moves
+            # trains between slots, so no two trains ever share a slot
+            self.toolbox.register("individual", tools.initIterate, creator.Individual,
+                                  create_permutation)
+            self.toolbox.register("mate", tools.cxPartialyMatched)
+            self.toolbox.register("mutate", tools.mutShuffleIndexes, indpb=0.05)
+        else:
+            self.toolbox.register("individual", tools.initIterate, creator.Individual,
+                                  create_individual)
+            self.toolbox.register("mate", tools.cxTwoPoint)
+            self.toolbox.register("mutate", self.mutate_assignment, indpb=0.1)
         self.toolbox.register("population", tools.initRepeat, list, self.toolbox.individual)
         self.toolbox.register("evaluate", self.evaluate_assignment)
-        self.toolbox.register("mate", tools.cxTwoPoint)
-        self.toolbox.register("mutate", self.mutate_assignment, indpb=0.1)
         self.toolbox.register("select", tools.selTournament, tournsize=3)
     
     def evaluate_assignment(self, individual: List[int]) -> Tuple[float,]:
@@ -220,200 +1294,2179 @@ class StablingOptimizer:
         Fitness function - evaluates quality of train-to-bay assignments
         Higher scores are better
         """
-        bay_ids = list(self.depot_bays.keys())
-        assignments = [(self.trains[i], bay_ids[individual[i]]) 
-                      for i in range(len(individual))]
+        genomes = self._decode_genomes(np.asarray([individual], dtype=np.intp))
+        return (float(self.evaluate_population(genomes)[0]),)
+    
+    def _slot_count(self) -> int:
+        """Bay slots in the permutation encoding: enough layers of bays for every train"""
+        problem = self.problem
+        layers = max(1, -(-problem.train_count // problem.bay_count))
+        return layers * problem.bay_count
+    
+    def _decode_genomes(self, genomes: np.ndarray) -> np.ndarray:
+        """
+        Map GA individuals to bay-index genomes
+        
+        In the permutation encoding, train i takes slot genome[i]; slot s is
+        layer s // bay_count of bay s % bay_count. Trains only share a bay when
+        there are more trains than bays.
+        """
+        if self._encoding != "permutation":
+            return genomes
+        return genomes[:, :self.problem.train_count] % self.problem.bay_count
+    
+    def _encode_permutation(self, genome: List[int]) -> List[int]:
+        """
+        Permutation individual placing each train in the bay chosen by genome
         
-        score = 0.0
+        A train whose bay already holds a train in every layer gets a slot of
+        some other bay; those overflow slots are only handed out after every
+        train that fits its bay has claimed its slot, so no slot is used twice.
+        """
+        bay_count = self.problem.bay_count
+        slot_count = self._slot_count()
+        layer = [0] * bay_count
+        slots: List[Optional[int]] = []
+        for bay in genome:
+            slot = layer[bay] * bay_count + bay
+            if slot < slot_count:
+                layer[bay] += 1
+                slots.append(slot)
+            else:
+                slots.append(None)
         
-        # Track bay usage for constraint checking
-        bay_usage = {bay_id: [] for bay_id in bay_ids}
+        used = set(slot for slot in slots if slot is not None)
+        free = [k for k in range(slot_count) if k not in used]
+        overflow = iter(free)
+        slots = [next(overflow) if slot is None else slot for slot in slots]
+        rest = list(overflow)
+        random.shuffle(rest)
+        encoded = slots + rest
+        assert sorted(encoded) == list(range(slot_count)), "encoding is not a permutation"
+        return encoded
+    
+    def evaluate_population(self, population) -> np.ndarray:
+        """
+        Vectorized fitness function - scores a whole population in one pass
         
-        for train, bay_id in assignments:
-            bay = self.depot_bays[bay_id]
-            bay_usage[bay_id].append(train)
-            
-            # HARD CONSTRAINT: Train must fit in bay
-            if train.length > bay.capacity:
-                score += self._fitness_weights['constraint_violation']
-                continue
-            
-            # SOFT CONSTRAINT: Cleaning requirements
-            if train.needs_cleaning and not bay.cleaning_enabled:
-                score += self._fitness_weights['cleaning_mismatch']
-                continue
-            
-            # OPTIMIZATION OBJECTIVES
-            
-            # Reward early departure trains closer to exit
-            if train.departure_minutes < 8 * 60:  # Before 8:00 AM
-                distance_bonus = max(0, 10 - bay.distance_to_exit)
-                score += distance_bonus * self._fitness_weights['early_departure_bonus']
-            
-            # Reward high priority trains
-            priority_bonus = (6 - train.priority)
-            score += priority_bonus * self._fitness_weights['priority_bonus']
+        Args:
+            population: 2-D integer array (individuals x trains) of bay indices
             
-            # Reward ready trains
-            if train.readiness == "ready":
-                score += self._fitness_weights['readiness_bonus']
+        Returns:
+            1-D float array of scores, one per individual
+        """
+        problem = self.problem
+        genomes = np.asarray(population, dtype=np.intp)
+        if genomes.ndim != 2 or genomes.shape[1] != problem.train_count:
+            raise ValueError(
+                f"Population must have shape (n, {problem.train_count}), got {genomes.shape}")
         
-        # Penalty for bay overcrowding (assuming 1 train per bay)
-        for bay_id, trains_in_bay in bay_usage.items():
-            if len(trains_in_bay) > 1:
-                excess_trains = len(trains_in_bay) - 1
-                score += excess_trains * self._fitness_weights['overcrowding_penalty']
+        weights = self._fitness_weights
+        train_idx = np.arange(problem.train_count)
+        if self._capacity_mode == "lane":
+            # Trains that do not fit the rest of their lane score like
+            # trains too long for their bay
+            spilled, blocked = self._lane_checks(genomes)
+            unserved = self._lane_cleaning(genomes, spilled)
+            scores = self._gene_scores(train_idx, genomes, spilled, unserved).sum(axis=1)
+            scores += blocked * weights['lane_blocking_penalty']
+        else:
+            # Penalty for bay overcrowding (assuming 1 train per bay)
+            scores = self._gene_scores(train_idx, genomes).sum(axis=1)
+            excess_trains = np.maximum(self._bay_usage(genomes) - 1, 0).sum(axis=1)
+            scores += excess_trains * weights['overcrowding_penalty']
         
         # Add shunting penalty
-        shunting_moves = self.calculate_shunting_moves(assignments)
-        score += shunting_moves * self._fitness_weights['shunting_penalty']
+        shunting_moves = self._population_shunting_moves(genomes)
+        scores += shunting_moves * weights['shunting_penalty']
         
-        # Ensure non-negative fitness
-        final_score = max(0, score)
-        return (final_score,)
+        # Not clamped at zero: tournament selection needs to rank infeasible
+        # plans too, or a depot with unavoidable violations gives no signal
+        return scores
     
-    def calculate_shunting_moves(self, assignments: List[Tuple[Train, str]]) -> float:
+    def _bay_usage(self, genomes: np.ndarray, weights: Optional[np.ndarray] = None) -> np.ndarray:
+        """Trains (or the sum of weights, one per train) per bay, per individual"""
+        pop_size, bay_count = genomes.shape[0], self.problem.bay_count
+        flat = (genomes + np.arange(pop_size)[:, None] * bay_count).ravel()
+        if weights is not None:
+            weights = np.broadcast_to(weights, genomes.shape).ravel()
+        usage = np.bincount(flat, weights=weights, minlength=pop_size * bay_count)
+        return usage.reshape(pop_size, bay_count)
+    
+    def _lane_checks(self, genomes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
         """
-        Estimate number of shunting moves required
-        Simple heuristic: later departing trains in front of earlier ones need moves
+        Lane feasibility for a whole population: spilled trains and blocked pairs
+        
+        Trains enter in train_arrival_rank order, so each lane is a stack. A
+        train spills when it fits its bay on its own but the lane's trains up
+        to and including it are longer than the lane; the mask (individuals
+        x trains) marks every such train. An earlier arrival departing
+        before a later one in the same lane is blocked. Sorting by (bay,
+        arrival rank) groups every row's trains lane by lane in arrival
+        order: cumulative lengths within each group give the spills, and
+        comparing each train with the ones `offset` places further on, for
+        offsets up to the fullest lane, finds every blocked pair with
+        O(depth) array ops of length population_size * trains.
         """
-        moves = 0.0
-        
-        # Group trains by departure time
-        departure_groups = {}
-        for train, bay_id in assignments:
-            dep_minutes = train.departure_minutes
-            if dep_minutes not in departure_groups:
-                departure_groups[dep_minutes] = []
-            departure_groups[dep_minutes].append((train, bay_id))
-        
-        # Check for trains that will need to be moved
-        sorted_times = sorted(departure_groups.keys())
-        
-        for i, early_time in enumerate(sorted_times):
-            for j, late_time in enumerate(sorted_times[i + 1:], i + 1):
-                # If a later train is closer to exit than earlier train, add penalty
-                for early_train, early_bay in departure_groups[early_time]:
-                    for late_train, late_bay in departure_groups[late_time]:
-                        early_distance = self.depot_bays[early_bay].distance_to_exit
-                        late_distance = self.depot_bays[late_bay].distance_to_exit
-                        
-                        if early_distance > late_distance:
-                            moves += 1.0
+        problem = self.problem
+        order = np.argsort(genomes * problem.train_count + problem.train_arrival_rank, axis=1)
+        lanes = np.take_along_axis(genomes, order, axis=1)
+        departures = problem.train_departure[order]
         
-        return moves
-    
-    def mutate_assignment(self, individual: List[int], indpb: float) -> Tuple[List[int],]:
-        """Custom mutation function with probability indpb per gene"""
-        bay_count = len(self.depot_bays)
-        for i in range(len(individual)):
-            if random.random() < indpb:
-                individual[i] = random.randint(0, bay_count - 1)
-        return individual,
+        lengths = problem.train_length[order]
+        filled = np.cumsum(lengths, axis=1)
+        # Index where each train's lane group starts, carried forward
+        starts = np.ones(lanes.shape, dtype=bool)
+        starts[:, 1:] = lanes[:, 1:] != lanes[:, :-1]
+        first = np.maximum.accumulate(
+            np.where(starts, np.arange(lanes.shape[1]), 0), axis=1)
+        filled -= np.take_along_axis(filled - lengths, first, axis=1)
+        capacity = problem.bay_capacity[lanes]
+        spilled = np.empty(genomes.shape, dtype=bool)
+        np.put_along_axis(spilled, order, (lengths <= capacity) & (filled > capacity), axis=1)
+        
+        depth = int(self._bay_usage(genomes).max(initial=0))
+        blocked = np.zeros(genomes.shape[0], dtype=np.int64)
+        for offset in range(1, depth):
+            same_lane = lanes[:, offset:] == lanes[:, :-offset]
+            departs_first = departures[:, :-offset] < departures[:, offset:]
+            blocked += np.count_nonzero(same_lane & departs_first, axis=1)
+        return spilled, blocked
     
-    def optimize(self, generations: int = 50, population_size: int = 100) -> Dict:
+    def _lane_cleaning(self, genomes: np.ndarray, spilled: np.ndarray) -> np.ndarray:
         """
-        Run genetic algorithm optimization
+        Trains left without a cleaning slot in their lane, for a whole population
         
-        Args:
-            generations: Number of generations to evolve
-            population_size: Size of population in each generation
-            
-        Returns:
-            Dict containing optimization results and assignments
+        A slot cleans one train, so the trains a lane holds (not spilled) that
+        need cleaning compete for its slots. Sorting each row by (lane,
+        deadline) and comparing each train's position with the slots ready by
+        its deadline (slots_ready) finds the lanes short of slots; only those
+        are resolved train by train (see _drop_cheapest).
         """
-        if not self.trains or not self.depot_bays:
-            raise ValueError("Cannot optimize: no trains or bays loaded")
+        problem = self.problem
+        unserved = np.zeros(genomes.shape, dtype=bool)
+        if not problem.has_cleaning_slots:
+            return unserved
+        wants = (problem.train_needs_cleaning & ~spilled
+                 & (problem.train_length <= problem.bay_capacity[genomes])
+                 & problem.cleaning_ok(np.arange(problem.train_count), genomes))
+        if not wants.any():
+            return unserved
         
-        # Setup genetic algorithm if not already done
-        if self.toolbox is None:
-            self.setup_genetic_algorithm()
+        deadline_rank = np.argsort(np.argsort(problem.train_cleaning_deadline, kind='stable'))
+        lanes = np.where(wants, genomes, problem.bay_count)
+        order = np.argsort(lanes * problem.train_count + deadline_rank, axis=1)
+        lanes = np.take_along_axis(lanes, order, axis=1)
+        starts = np.ones(lanes.shape, dtype=bool)
+        starts[:, 1:] = lanes[:, 1:] != lanes[:, :-1]
+        positions = np.arange(lanes.shape[1])
+        first = np.maximum.accumulate(np.where(starts, positions, 0), axis=1)
+        ready = problem.slots_ready(order, np.minimum(lanes, problem.bay_count - 1))
+        short = (lanes < problem.bay_count) & (ready <= positions - first)
+        if not short.any():
+            return unserved
         
-        print(f"🧬 Starting optimization: {generations} generations, population {population_size}")
+        # The short lanes' trains, still in (lane, deadline) order, with the
+        # score each would lose without a slot
+        short_lanes = np.zeros((genomes.shape[0], problem.bay_count + 1), dtype=bool)
+        short_lanes[np.nonzero(short)[0], lanes[short]] = True
+        rows, positions = np.nonzero(np.take_along_axis(short_lanes, lanes, axis=1))
+        trains, bays = order[rows, positions], lanes[rows, positions]
+        losses = (self._gene_scores(trains, bays)
+                  - self._gene_scores(trains, bays, unserved=np.ones(len(trains), dtype=bool)))
+        bounds = np.flatnonzero(np.diff(rows * problem.bay_count + bays)) + 1
+        ready = ready[rows, positions].tolist()
+        rows, trains, losses = rows.tolist(), trains.tolist(), losses.tolist()
+        for start, end in zip([0] + bounds.tolist(), bounds.tolist() + [len(trains)]):
+            left_out = _drop_cheapest(trains[start:end], ready[start:end], losses[start:end])
+            unserved[rows[start], left_out] = True
+        return unserved
+    
+    def _unserved_cleaning(self, bay: int, trains: List[int]) -> List[int]:
+        """Which of trains, all wanting a slot in lane bay, go without (see _drop_cheapest)"""
+        problem = self.problem
+        deadlines = problem.train_cleaning_deadline
+        trains = sorted(trains, key=lambda t: (deadlines[t], t))
+        ready = problem.slots_ready(trains, bay).tolist()
+        if all(count > k for k, count in enumerate(ready)):
+            return []
+        idx = np.array(trains, dtype=np.intp)
+        losses = (self._gene_scores(idx, bay)
+                  - self._gene_scores(idx, bay, unserved=np.ones(len(idx), dtype=bool)))
+        return _drop_cheapest(trains, ready, losses.tolist())
+    
+    def _gene_scores(self, train_idx: np.ndarray, bay_idx: np.ndarray,
+                     spilled: Optional[np.ndarray] = None,
+                     unserved: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Score of parking train_idx in bay_idx, gene by gene (broadcastable index arrays)
         
-        # Create initial population
-        population = self.toolbox.population(n=population_size)
+        Covers everything in the fitness function that depends on a single
+        train/bay pair; overcrowding and shunting depend on the whole genome.
+        Trains marked in spilled (see _lane_checks) are scored as if too long
+        for their bay, those marked in unserved (see _lane_cleaning) as if the
+        bay could not clean them.
+        """
+        problem = self.problem
+        weights = self._fitness_weights
         
-        # Statistics tracking
-        stats = tools.Statistics(lambda ind: ind.fitness.values)
-        stats.register("avg", np.mean)
-        stats.register("min", np.min)
-        stats.register("max", np.max)
-        
-        # Run evolutionary algorithm
-        population, logbook = algorithms.eaSimple(
-            population, self.toolbox,
-            cxpb=0.7,  # Crossover probability
-            mutpb=0.3,  # Mutation probability
-            ngen=generations,
-            stats=stats,
-            verbose=False
-        )
+        # HARD CONSTRAINT: Train must fit in bay. A capacity violation masks the
+        # cleaning check, and either one masks the optimization objectives
+        fits = problem.train_length[train_idx] <= problem.bay_capacity[bay_idx]
+        if spilled is not None:
+            fits = fits & ~spilled
+        cleaning_ok = problem.cleaning_ok(train_idx, bay_idx)
+        if unserved is not None:
+            cleaning_ok = cleaning_ok & ~unserved
+        scored = fits & cleaning_ok
         
-        # Extract best solution
-        best_individual = tools.selBest(population, 1)[0]
-        best_fitness = best_individual.fitness.values[0]
+        # OPTIMIZATION OBJECTIVES: early departures near the exit, high
+        # priority and ready trains
+        distance_bonus = np.maximum(0, 10 - problem.bay_distance_to_exit[bay_idx])
+        bonus = ((problem.train_departure[train_idx] < 8 * 60) * distance_bonus
+                 * weights['early_departure_bonus']
+                 + (6 - problem.train_priority[train_idx]) * weights['priority_bonus']
+                 + (problem.train_readiness[train_idx] == 0) * weights['readiness_bonus'])
         
-        # Convert to readable format
-        bay_ids = list(self.depot_bays.keys())
-        assignments = []
+        gene_scores = np.where(scored, bonus, 0.0)
+        gene_scores += np.where(~fits, weights['constraint_violation'], 0.0)
+        gene_scores += np.where(fits & ~cleaning_ok, weights['cleaning_mismatch'], 0.0)
         
-        for i, bay_index in enumerate(best_individual):
-            train = self.trains[i]
-            bay_id = bay_ids[bay_index]
-            bay = self.depot_bays[bay_id]
-            
+        # Stability: penalty for moving a train away from its previous bay
+        if self._relocation_penalty:
+            previous = self._previous_bays[train_idx]
+            moved = (previous >= 0) & (previous != bay_idx)
+            gene_scores -= np.where(moved, self._relocation_penalty, 0.0)
+        return gene_scores
+    
+    def incremental_evaluator(self, individual: List[int]) -> "IncrementalEvaluator":
+        """Delta evaluator seeded with a parent genome, for move-based search"""
+        return IncrementalEvaluator(self, individual)
+    
+    def _population_shunting_moves(self, genomes: np.ndarray) -> np.ndarray:
+        """
+        Batch version of calculate_shunting_moves
+        
+        Runs the same Fenwick-tree inversion count for every individual at once:
+        trains are visited in departure order and each row keeps its own tree
+        over distance ranks, so the cost is O(n log d) array ops of length
+        population_size instead of O(n^2) pair comparisons.
+        
+        With a track graph, counts blocking pairs on the exit paths instead
+        (see _population_graph_shunting_moves).
+        """
+        problem = self.problem
+        if problem.has_track_graph:
+            return self._population_graph_shunting_moves(genomes)
+        pop_size = genomes.shape[0]
+        ranks = problem.bay_distance_rank[genomes]  # 1-based Fenwick index
+        size = int(problem.bay_distance_rank.max())
+        tree = np.zeros((pop_size, size + 1), dtype=np.int64)
+        rows = np.arange(pop_size)
+        moves = np.zeros(pop_size, dtype=np.int64)
+        
+        inserted = 0
+        for start, end in problem.departure_groups:
+            group = problem.departure_order[start:end]
+            # Query the whole group before inserting it: equal departures never count
+            for train_idx in group:
+                idx = ranks[:, train_idx].copy()
+                not_above = np.zeros(pop_size, dtype=np.int64)
+                while True:
+                    active = idx > 0
+                    if not active.any():
+                        break
+                    not_above[active] += tree[rows[active], idx[active]]
+                    idx -= idx & -idx
+                moves += inserted - not_above
+            for train_idx in group:
+                idx = ranks[:, train_idx].copy()
+                while True:
+                    active = idx <= size
+                    if not active.any():
+                        break
+                    tree[rows[active], idx[active]] += 1
+                    idx += idx & -idx
+            inserted += len(group)
+        
+        return moves.astype(float)
+    
+    def _population_graph_shunting_moves(self, genomes: np.ndarray) -> np.ndarray:
+        """
+        Shunting moves on the track graph for a whole population
+        
+        A later-departing train parked in a bay on an earlier train's exit
+        path has to be shunted out of the way: one move per such pair.
+        Departure groups are visited latest first while each row counts the
+        trains already placed per bay, so every train costs one gather of its
+        exit path, O(n * depth) table lookups per individual.
+        """
+        problem = self.problem
+        pop_size = genomes.shape[0]
+        rows = np.arange(pop_size)[:, None]
+        # Column bay_count pads the path table and always stays zero
+        later = np.zeros((pop_size, problem.bay_count + 1), dtype=np.int64)
+        moves = np.zeros(pop_size, dtype=np.int64)
+        
+        for start, end in reversed(problem.departure_groups):
+            group = problem.departure_order[start:end]
+            bays = genomes[:, group]
+            # Query the whole group before counting it: equal departures never block
+            moves += later[rows[:, :, None], problem.bay_exit_paths[bays]].sum(axis=(1, 2))
+            np.add.at(later, (np.broadcast_to(rows, bays.shape), bays), 1)
+        
+        return moves.astype(float)
+    
+    def _evaluate_invalid(self, individuals: List) -> int:
+        """
+        Assign fitness to every individual without a valid one, in a single batch
+        
+        With a fitness cache enabled, genomes seen before are served from it and
+        only distinct unseen genomes reach evaluate_population.
+        """
+        invalid = [ind for ind in individuals if not ind.fitness.valid]
+        if not invalid:
+            return 0
+        
+        genomes = self._decode_genomes(np.array(invalid, dtype=np.intp))
+        cache = self._fitness_cache
+        if cache is None:
+            scores = self._score_genomes(genomes)
+            for ind, score in zip(invalid, scores):
+                ind.fitness.values = (float(score),)
+            return len(invalid)
+        
+        keys = [cache.genome_key(genome) for genome in genomes]
+        pending: Dict[bytes, List[int]] = {}
+        for i, key in enumerate(keys):
+            if key in pending:
+                # Duplicate of a genome already queued in this batch
+                cache.hits += 1
+                pending[key].append(i)
+                continue
+            score = cache.get(key)
+            if score is None:
+                pending[key] = [i]
+            else:
+                invalid[i].fitness.values = (score,)
+        
+        if pending:
+            rows = [members[0] for members in pending.values()]
+            scores = self._score_genomes(genomes[rows])
+            for (key, members), score in zip(pending.items(), scores):
+                cache.put(key, float(score))
+                for i in members:
+                    invalid[i].fitness.values = (float(score),)
+        return len(pending)
+    
+    def calculate_shunting_moves(self, assignments: List[Tuple[Train, str]]) -> float:
+        """
+        Estimate number of shunting moves required
+        Simple heuristic: later departing trains in front of earlier ones need moves
+        
+        Counts (earlier, later) departure pairs where the earlier train is parked
+        further from the exit, as inversions over (departure, distance) with a
+        Fenwick tree: O(n log n) instead of comparing every pair.
+        
+        With a track graph, counts (earlier, later) pairs where the later train
+        is parked on the earlier one's exit path instead.
+        """
+        problem = self.problem
+        if problem.has_track_graph:
+            bay_index = {bay_id: b for b, bay_id in enumerate(problem.bay_ids)}
+            by_departure = sorted(((train.departure_minutes, bay_index[bay_id])
+                                   for train, bay_id in assignments), reverse=True)
+            later = Counter()
+            moves = 0
+            # Latest departures first; a departure group is counted only once all
+            # of it has been looked up, since equal departures never block
+            for _, group in groupby(by_departure, key=lambda entry: entry[0]):
+                bays = [bay for _, bay in group]
+                moves += sum(later[ahead] for bay in bays for ahead in problem.exit_path(bay))
+                later.update(bays)
+            return float(moves)
+        
+        entries = sorted(
+            (train.departure_minutes, self.depot_bays[bay_id].distance_to_exit)
+            for train, bay_id in assignments
+        )
+        if not entries:
+            return 0.0
+        
+        distance_rank = {d: r for r, d in enumerate(sorted({d for _, d in entries}), 1)}
+        size = len(distance_rank)
+        tree = [0] * (size + 1)
+        moves = 0
+        inserted = 0
+        
+        start = 0
+        while start < len(entries):
+            end = start
+            while end < len(entries) and entries[end][0] == entries[start][0]:
+                end += 1
+            
+            # Trains leaving at the same time never block each other, so the
+            # whole group is counted against earlier groups before insertion
+            for _, distance in entries[start:end]:
+                idx = distance_rank[distance]
+                not_further = 0
+                while idx > 0:
+                    not_further += tree[idx]
+                    idx -= idx & -idx
+                moves += inserted - not_further
+            
+            for _, distance in entries[start:end]:
+                idx = distance_rank[distance]
+                while idx <= size:
+                    tree[idx] += 1
+                    idx += idx & -idx
+            
+            inserted += end - start
+            start = end
+        
+        return float(moves)
+    
+    def mutate_assignment(self, individual: List[int], indpb: float) -> Tuple[List[int],]:
+        """Custom mutation function with probability indpb per gene (draws from the train's domain)"""
+        problem = self.problem
+        for i in range(len(individual)):
+            if random.random() < indpb:
+                individual[i] = problem.random_bay(i)
+        return individual,
+    
+    def greedy_assignment(self, rng: Optional[random.Random] = None,
+                          candidates: int = 3) -> List[int]:
+        """
+        Constructive heuristic: park trains in departure/priority order, each in
+        the nearest free bay it fits (with cleaning when it needs it)
+        
+        Falls back to a free bay it only fits, then to the least used
+        compatible bay, so every train gets a bay. In "lane" capacity mode a
+        bay counts as free while the train still fits in the lane without
+        blocking or being blocked by a train already there (in arrival
+        order). With rng, the train order is jittered and each train picks
+        among its `candidates` nearest options, giving diverse variants of
+        the same plan.
+        
+        In "lane" mode a lane cleans a train only while its slots can still
+        take one more train (see _unserved_cleaning).
+        """
+        problem = self.problem
+        lengths = problem.train_length.tolist()
+        needs_cleaning = problem.train_needs_cleaning.tolist()
+        departures = problem.train_departure.tolist()
+        priorities = problem.train_priority.tolist()
+        capacities = problem.bay_capacity.tolist()
+        cleaning_ready = problem.bay_cleaning_ready.tolist()
+        deadlines = problem.train_cleaning_deadline.tolist()
+        arrival_ranks = problem.train_arrival_rank.tolist()
+        bays_by_distance = sorted(range(problem.bay_count),
+                                  key=lambda b: problem.bay_distance_to_exit[b])
+        
+        def order_key(i: int):
+            jitter = rng.uniform(0, 30) if rng else 0
+            return departures[i] + jitter, priorities[i]
+        
+        usage = [0] * problem.bay_count
+        lanes: List[List[int]] = [[] for _ in range(problem.bay_count)]
+        fill = [0] * problem.bay_count
+        # Deadlines of the trains holding each lane's cleaning slots
+        slot_ends = [ends.tolist() for ends in problem.bay_slot_ends]
+        slot_deadlines: List[List[int]] = [[] for _ in range(problem.bay_count)]
+        share_slots = self._capacity_mode == "lane" and problem.has_cleaning_slots
+        
+        def has_slot(i: int, b: int) -> bool:
+            if not share_slots or not slot_deadlines[b]:
+                return True
+            wanting = sorted(slot_deadlines[b] + [deadlines[i]])
+            return all(bisect.bisect_right(slot_ends[b], d) > k for k, d in enumerate(wanting))
+        
+        def is_free(i: int, b: int) -> bool:
+            if self._capacity_mode != "lane":
+                return usage[b] == 0
+            return fill[b] + lengths[i] <= capacities[b] and not any(
+                departures[j] < departures[i] if arrival_ranks[j] < arrival_ranks[i]
+                else departures[i] < departures[j]
+                for j in lanes[b])
+        
+        genome = [0] * problem.train_count
+        for i in sorted(range(problem.train_count), key=order_key):
+            fitting = [b for b in bays_by_distance if lengths[i] <= capacities[b]]
+            compatible = [b for b in fitting if not needs_cleaning[i]
+                          or (cleaning_ready[b] <= deadlines[i] and has_slot(i, b))]
+            options = ([b for b in compatible if is_free(i, b)]
+                       or [b for b in fitting if is_free(i, b)])
+            if not options:
+                pool = compatible or fitting or bays_by_distance
+                least = min(usage[b] for b in pool)
+                options = [b for b in pool if usage[b] == least]
+            
+            bay = rng.choice(options[:candidates]) if rng else options[0]
+            genome[i] = bay
+            usage[bay] += 1
+            lanes[bay].append(i)
+            fill[bay] += lengths[i]
+            if needs_cleaning[i] and bay in compatible:
+                slot_deadlines[bay].append(deadlines[i])
+        return genome
+    
+    def _seed_population(self, population: List, fraction: float) -> int:
+        """Replace a fraction of the population with greedy plans and randomized variants"""
+        count = min(len(population), int(round(fraction * len(population))))
+        rng = random.Random(random.getrandbits(32))
+        for k in range(count):
+            genome = self.greedy_assignment(rng if k else None)
+            if self._encoding == "permutation":
+                genome = self._encode_permutation(genome)
+            population[k] = creator.Individual(genome)
+        return count
+    
+    def build_assignments(self, individual: List[int]) -> List[Dict]:
+        """Convert a genome into the per-train assignment records of the API response"""
+        problem = self.problem
+        genes = np.asarray(individual, dtype=np.intp)
+        capacity = problem.bay_capacity[genes]
+        # Whether the bay can clean the train before it departs
+        cleaning = problem.bay_cleaning_ready[genes] <= problem.train_cleaning_deadline
+        distance = problem.bay_distance_to_exit[genes]
+        lane_mode = self._capacity_mode == "lane"
+        if lane_mode:
+            spilled = self._lane_checks(genes[None, :])[0][0]
+            # A train whose lane ran out of slots cannot be cleaned there
+            cleaning &= ~self._lane_cleaning(genes[None, :], spilled[None, :])[0]
+            departures = problem.train_departure
+            arrival_ranks = problem.train_arrival_rank
+            lanes: Dict[int, List[int]] = {}
+            for i in np.argsort(arrival_ranks).tolist():
+                lanes.setdefault(int(genes[i]), []).append(i)
+            # Trains the lane holds and cleans, each in a slot of its own
+            cleaned = (problem.train_needs_cleaning & cleaning & ~spilled
+                       & (problem.train_length <= capacity))
+            lane_slots = {}
+            for bay, lane in lanes.items():
+                lane_slots.update(problem.lane_cleaning_slots(bay, [i for i in lane if cleaned[i]]))
+        
+        assignments = []
+        for i, bay_index in enumerate(genes):
             # Check for constraint violations
             violations = []
-            if train.length > bay.capacity:
+            if problem.train_length[i] > capacity[i]:
                 violations.append("length_exceeds_capacity")
-            if train.needs_cleaning and not bay.cleaning_enabled:
-                violations.append("cleaning_not_available")
+            elif lane_mode and spilled[i]:
+                violations.append("lane_over_capacity")
+            slot = None
+            if problem.train_needs_cleaning[i]:
+                if not cleaning[i]:
+                    violations.append("cleaning_not_available")
+                elif lane_mode:
+                    slot = lane_slots.get(i)
+                else:
+                    slot = problem.cleaning_slot(i, bay_index)
             
             assignments.append({
-                "trainId": train.id,
-                "bayId": bay_id,
-                "trainLength": train.length,
-                "bayCapacity": bay.capacity,
-                "needsCleaning": train.needs_cleaning,
-                "cleaningAvailable": bay.cleaning_enabled,
-                "departureTime": train.departure_time,
-                "priority": train.priority,
-                "readiness": train.readiness,
-                "distanceToExit": bay.distance_to_exit,
+                "trainId": problem.train_ids[i],
+                "bayId": problem.bay_ids[bay_index],
+                "trainLength": int(problem.train_length[i]),
+                "bayCapacity": int(capacity[i]),
+                "needsCleaning": bool(problem.train_needs_cleaning[i]),
+                "cleaningAvailable": bool(cleaning[i]),
+                "cleaningSlot": {
+                    "start": f"{slot[0] // 60:02d}:{slot[0] % 60:02d}",
+                    "end": f"{slot[1] // 60:02d}:{slot[1] % 60:02d}"
+                } if slot else None,
+                "departureTime": problem.train_departure_times[i],
+                "priority": int(problem.train_priority[i]),
+                "readiness": READINESS_STATES[problem.train_readiness[i]],
+                "distanceToExit": int(distance[i]),
                 "violations": violations
             })
+            if lane_mode:
+                # Position 0 is the first arrival, deepest in the lane; blockedBy
+                # lists the later arrivals in front of it that depart after it
+                lane = lanes[int(bay_index)]
+                assignments[-1]["lanePosition"] = lane.index(i)
+                assignments[-1]["blockedBy"] = [
+                    problem.train_ids[j] for j in lane
+                    if arrival_ranks[j] > arrival_ranks[i] and departures[j] > departures[i]]
+        return assignments
+    
+    def assignment_genome(self, assignments: List[Dict]) -> List[int]:
+        """Convert assignment records (trainId/bayId) back into a genome"""
+        problem = self.problem
+        bay_index = {bay_id: b for b, bay_id in enumerate(problem.bay_ids)}
+        planned = {a["trainId"]: a["bayId"] for a in assignments}
+        try:
+            return [bay_index[planned[train_id]] for train_id in problem.train_ids]
+        except KeyError as e:
+            raise ValueError(f"Assignment does not cover the loaded data: {e}")
+    
+    def _improve_best(self, population: List, top_k: int, max_moves: int) -> int:
+        """
+        Memetic step: hill-climb the top_k individuals in place
+        
+        Each gets max_moves random single-train moves (within the train's
+        feasible domain) and pairwise swaps, kept only when they raise the
+        fitness, scored with an IncrementalEvaluator. Returns the number of
+        accepted moves.
+        """
+        problem = self.problem
+        accepted = 0
+        for ind in tools.selBest(population, top_k):
+            genome = self._decode_genomes(np.array([ind], dtype=np.intp))[0]
+            evaluator = self.incremental_evaluator(genome)
+            improved = 0
+            for _ in range(max_moves):
+                current = evaluator.raw_score
+                train = random.randrange(problem.train_count)
+                if random.random() < 0.5:
+                    bay, previous = problem.random_bay(train), evaluator.genes[train]
+                    if bay == previous:
+                        continue
+                    evaluator.move(train, bay)
+                    if evaluator.raw_score > current:
+                        improved += 1
+                    else:
+                        evaluator.move(train, previous)
+                else:
+                    other = random.randrange(problem.train_count)
+                    if evaluator.genes[train] == evaluator.genes[other]:
+                        continue
+                    evaluator.swap(train, other)
+                    if evaluator.raw_score > current:
+                        improved += 1
+                    else:
+                        evaluator.swap(train, other)
+            
+            if not improved:
+                continue
+            genes = list(evaluator.genes)
+            if self._encoding == "permutation":
+                genes = self._encode_permutation(genes)
+                # A bay with more trains than layers cannot be encoded exactly
+                decoded = self._decode_genomes(np.array([genes], dtype=np.intp))[0]
+                if list(decoded) != evaluator.genes:
+                    continue
+            ind[:] = genes
+            ind.fitness.values = (evaluator.score,)
+            accepted += improved
+        return accepted
+    
+    def hard_violations(self, individual) -> int:
+        """
+        Hard-constraint violations of one plan (a bay index per train)
+
+        Trains too long for their bay or its lane, cleaning needs the bay (or
+        its lane's slots) cannot meet and, in "single" mode, every train
+        beyond the first in a bay; a plan is feasible when this is zero.
+        """
+        problem = self.problem
+        genes = np.asarray(individual, dtype=np.intp)
+        too_long = problem.train_length > problem.bay_capacity[genes]
+        no_cleaning = ~problem.cleaning_ok(np.arange(problem.train_count), genes)
+        if self._capacity_mode == "lane":
+            spilled = self._lane_checks(genes[None, :])[0][0]
+            no_cleaning |= self._lane_cleaning(genes[None, :], spilled[None, :])[0]
+            too_long |= spilled
+            excess_trains = 0
+        else:
+            usage = np.bincount(genes, minlength=problem.bay_count)
+            excess_trains = np.maximum(usage - 1, 0).sum()
+        return int(np.count_nonzero(too_long) + np.count_nonzero(no_cleaning) + excess_trains)
+
+    def _best_violations(self, population: List) -> int:
+        """Hard-constraint violations of the fittest individual in population"""
+        best = max(population, key=lambda ind: ind.fitness.values[0])
+        return self.hard_violations(self._decode_genomes(np.array([best], dtype=np.intp))[0])
+    
+    def _evolve(self, population: List, cxpb: float, mutpb: float, ngen: int,
+                stats: tools.Statistics, halloffame: Optional[tools.HallOfFame] = None,
+                deadline: Optional[float] = None, stagnation: int = 0,
+                cancel_event=None,
+                on_generation: Optional[Callable[[Dict], None]] = None,
+                local_search: Tuple[int, int] = (0, 0)
+                ) -> Tuple[List, tools.Logbook, str]:
+        """
+        Same generational loop as algorithms.eaSimple, but each generation's
+        invalid individuals are scored together by evaluate_population
+        
+        Stops early once time.time() passes deadline ("time_limit"), when the
+        best fitness has not improved for `stagnation` generations
+        ("stagnation") or once cancel_event is set ("cancelled"); otherwise
+        runs all ngen generations ("completed").
+        
+        on_generation, if given, is called with each logbook record as soon as
+        the generation has been evaluated. local_search = (top_k, moves) adds
+        the memetic step of _improve_best after every evaluation; accepted
+        moves are logged as localMoves.
+        
+        Each record also carries the generation's wall time and its split
+        between selection, variation, evaluation and local search (seconds).
+        """
+        logbook = tools.Logbook()
+        logbook.header = (['gen', 'nevals'] + stats.fields + ['violations', 'localMoves']
+                          + list(GENERATION_TIMINGS))
+        top_k, local_moves = local_search
+        
+        started = time.perf_counter()
+        nevals = self._evaluate_invalid(population)
+        evaluated = time.perf_counter()
+        improved = self._improve_best(population, top_k, local_moves) if top_k else 0
+        searched = time.perf_counter()
+        if halloffame is not None:
+            halloffame.update(population)
+        record = stats.compile(population)
+        logbook.record(gen=0, nevals=nevals, violations=self._best_violations(population),
+                       localMoves=improved, selectSeconds=0.0, varySeconds=0.0,
+                       evalSeconds=evaluated - started,
+                       localSeconds=searched - evaluated,
+                       seconds=time.perf_counter() - started, **record)
+        if on_generation is not None:
+            on_generation(logbook[-1])
+        
+        best_so_far, improved_at = record["max"], 0
+        stop_reason = "completed"
+        for gen in range(1, ngen + 1):
+            if deadline is not None and time.time() >= deadline:
+                stop_reason = "time_limit"
+                break
+            if cancel_event is not None and cancel_event.is_set():
+                stop_reason = "cancelled"
+                break
+            
+            started = time.perf_counter()
+            offspring = self.toolbox.select(population, len(population))
+            selected = time.perf_counter()
+            offspring = algorithms.varAnd(offspring, self.toolbox, cxpb, mutpb)
+            varied = time.perf_counter()
+            nevals = self._evaluate_invalid(offspring)
+            evaluated = time.perf_counter()
+            improved = self._improve_best(offspring, top_k, local_moves) if top_k else 0
+            searched = time.perf_counter()
+            if halloffame is not None:
+                halloffame.update(offspring)
+            population[:] = offspring
+            record = stats.compile(population)
+            logbook.record(gen=gen, nevals=nevals,
+                           violations=self._best_violations(population),
+                           localMoves=improved, selectSeconds=selected - started,
+                           varySeconds=varied - selected, evalSeconds=evaluated - varied,
+                           localSeconds=searched - evaluated,
+                           seconds=time.perf_counter() - started, **record)
+            if on_generation is not None:
+                on_generation(logbook[-1])
+            
+            if record["max"] > best_so_far:
+                best_so_far, improved_at = record["max"], gen
+            elif stagnation and gen - improved_at >= stagnation:
+                stop_reason = "stagnation"
+                break
+        
+        return population, logbook, stop_reason
+    
+    def _evolve_islands(self, population: List, islands: int, migration_interval: int,
+                        migrants: int, cxpb: float, mutpb: float, ngen: int,
+                        halloffame: tools.HallOfFame, deadline: Optional[float] = None,
+                        stagnation: int = 0, cancel_event=None,
+                        on_generation: Optional[Callable[[Dict], None]] = None,
+                        local_search: Tuple[int, int] = (0, 0),
+                        fitness_cache_size: int = 0
+                        ) -> Tuple[List, tools.Logbook, str, Optional[Dict]]:
+        """
+        Island model: split the population into sub-populations that evolve
+        independently in worker processes, migrating the best individuals
+        around a ring every migration_interval generations
+        
+        Per-island logbooks are merged into one record per generation, so the
+        returned logbook has the same shape as _evolve's. Islands stop at the
+        deadline themselves; stagnation is checked on the merged records
+        after each epoch, and on_generation receives them at the end of each
+        epoch. With fitness_cache_size, every worker process keeps a fitness
+        cache of that size for the run; their combined counters are returned
+        in the shape of FitnessCache.stats, plus the number of caches.
+        """
+        pool = self._get_pool(islands)
+        cache_run = uuid.uuid4().hex
+        cache_hits = cache_misses = 0
+        cache_sizes: Dict[int, int] = {}  # worker pid -> entries
+        sub_populations = [population[i::islands] for i in range(islands)]
+        merged = tools.Logbook()
+        merged.header = (['gen', 'nevals', 'avg', 'min', 'max', 'violations', 'localMoves']
+                         + list(GENERATION_TIMINGS))
+        
+        done = 0
+        best_so_far, improved_at = None, 0
+        stop_reason = "completed"
+        while done < ngen:
+            if deadline is not None and time.time() >= deadline and done > 0:
+                stop_reason = "time_limit"
+                break
+            if cancel_event is not None and cancel_event.is_set() and done > 0:
+                stop_reason = "cancelled"
+                break
+            
+            epoch = min(migration_interval, ngen - done)
+            tasks = [([list(ind) for ind in sub],
+                      [ind.fitness.values[0] if ind.fitness.valid else None for ind in sub],
+                      epoch, cxpb, mutpb, random.randrange(2 ** 32), self._encoding, deadline,
+                      local_search, fitness_cache_size, cache_run)
+                     for sub in sub_populations]
+            outcomes = pool.map(_run_island_epoch, tasks, chunksize=1)
+            
+            sub_populations = []
+            for genomes, fitnesses, _, (best_genome, best_fitness), _, counts in outcomes:
+                if counts is not None:
+                    pid, hits, misses, size = counts
+                    cache_hits, cache_misses = cache_hits + hits, cache_misses + misses
+                    cache_sizes[pid] = size
+                best = creator.Individual(best_genome)
+                best.fitness.values = (best_fitness,)
+                halloffame.update([best])
+                sub = []
+                for genome, fitness in zip(genomes, fitnesses):
+                    ind = creator.Individual(genome)
+                    ind.fitness.values = (fitness,)
+                    sub.append(ind)
+                sub_populations.append(sub)
+            
+            # Generation 0 is the initial evaluation; later epochs restart at an
+            # already evaluated population, so their gen-0 record is skipped.
+            # Islands cut short by the deadline are merged up to the shortest one
+            first = 0 if done == 0 else 1
+            records = [records[first:] for _, _, records, _, _, _ in outcomes]
+            steps = min(len(island_records) for island_records in records)
+            for step in range(steps):
+                rows = [island_records[step] for island_records in records]
+                gen = done + step + first
+                leader = max(rows, key=lambda r: r['max'])
+                merged.record(gen=gen,
+                              nevals=sum(r['nevals'] for r in rows),
+                              avg=float(np.mean([r['avg'] for r in rows])),
+                              min=float(np.min([r['min'] for r in rows])),
+                              max=float(leader['max']),
+                              violations=leader['violations'],
+                              localMoves=sum(r['localMoves'] for r in rows),
+                              # Islands run in parallel: time spent is summed,
+                              # the generation takes as long as the slowest
+                              **{key: sum(r[key] for r in rows)
+                                 for key in GENERATION_TIMINGS if key != 'seconds'},
+                              seconds=max(r['seconds'] for r in rows))
+                if on_generation is not None:
+                    on_generation(merged[-1])
+                if best_so_far is None or merged[-1]['max'] > best_so_far:
+                    best_so_far, improved_at = merged[-1]['max'], gen
+            
+            done += steps - 1 + first
+            if any(reason == "time_limit" for *_, reason, _ in outcomes):
+                stop_reason = "time_limit"
+                break
+            if stagnation and done - improved_at >= stagnation:
+                stop_reason = "stagnation"
+                break
+            if done < ngen and migrants > 0:
+                tools.migRing(sub_populations, migrants, tools.selBest,
+                              replacement=tools.selWorst)
+        
+        lookups = cache_hits + cache_misses
+        cache_stats = {
+            "size": sum(cache_sizes.values()),
+            "maxSize": fitness_cache_size * len(cache_sizes),
+            "hits": cache_hits,
+            "misses": cache_misses,
+            "hitRate": round(cache_hits / lookups, 4) if lookups else 0.0,
+            "caches": len(cache_sizes)
+        } if fitness_cache_size > 0 else None
+        return [ind for sub in sub_populations for ind in sub], merged, stop_reason, cache_stats
+    
+    def optimize(self, generations: int = 50, population_size: int = 100,
+                 fitness_cache_size: int = 0, workers: int = 1, islands: int = 1,
+                 migration_interval: int = 10, migrants: int = 2,
+                 seed_fraction: float = 0.0, encoding: str = "assignment",
+                 stagnation_generations: int = 0,
+                 time_limit_ms: Optional[int] = None, cancel_event=None,
+                 on_progress: Optional[Callable[[Dict], None]] = None,
+                 local_search_top_k: int = 0, local_search_moves: int = 50) -> Dict:
+        """
+        Run genetic algorithm optimization
+        
+        Args:
+            generations: Number of generations to evolve
+            population_size: Size of population in each generation
+            fitness_cache_size: Max genomes kept in the LRU fitness cache (0 disables it);
+                with islands, per worker process
+            workers: Processes used for fitness evaluation (1 evaluates in-process)
+            islands: Sub-populations evolved in separate processes (1 disables the island model)
+            migration_interval: Generations between migrations in island mode
+            migrants: Best individuals each island sends to the next one per migration
+            seed_fraction: Share of the initial population built by the greedy heuristic
+            encoding: Genome encoding, "assignment" or "permutation"
+            stagnation_generations: Stop after this many generations without
+                improvement of the best fitness (0 disables early stopping)
+            time_limit_ms: Wall-clock budget; the best plan found so far is
+                returned once it is spent
+            cancel_event: Event-like object; once set, the run stops and returns
+                its best plan so far
+            on_progress: Called after every generation with its number, the
+                max/avg/min fitness, the best plan's violations and the
+                elapsed time
+            local_search_top_k: Individuals hill-climbed after each generation
+                (0 disables the memetic local search)
+            local_search_moves: Move or swap attempts per hill-climbed individual
+            
+        Returns:
+            Dict containing optimization results and assignments
+        """
+        if not self.trains or not self.depot_bays:
+            raise ValueError("Cannot optimize: no trains or bays loaded")
+        if islands > 1 and population_size < 2 * islands:
+            raise ValueError("population_size must allow at least 2 individuals per island")
+        
+        # Setup genetic algorithm if not already done
+        if self.toolbox is None or self._encoding != encoding:
+            self.setup_genetic_algorithm(encoding)
+        
+        problem = self.problem
+        # Island workers keep their own caches (see _evolve_islands)
+        self._fitness_cache = (FitnessCache(fitness_cache_size)
+                               if fitness_cache_size > 0 and islands == 1 else None)
+        self._workers = max(1, workers)
+        
+        print(f"🧬 Starting optimization: {generations} generations, population {population_size}, "
+              f"{self._workers} worker(s), {islands} island(s)")
+        started = time.time()
+        deadline = started + time_limit_ms / 1000 if time_limit_ms else None
+        
+        def on_generation(record: Dict) -> None:
+            on_progress({
+                "generation": record["gen"],
+                "generations": generations,
+                "maxFitness": float(record["max"]),
+                "avgFitness": float(record["avg"]),
+                "minFitness": float(record["min"]),
+                "violations": int(record["violations"]),
+                "evaluations": int(record["nevals"]),
+                "elapsedMs": round((time.time() - started) * 1000, 1)
+            })
+        
+        # Create initial population
+        population = self.toolbox.population(n=population_size)
+        seeded = self._seed_population(population, seed_fraction) if seed_fraction > 0 else 0
+        previous = self.previous_genome()
+        if previous is not None:
+            if encoding == "permutation":
+                previous = self._encode_permutation(previous)
+            population[-1] = creator.Individual(previous)
+            seeded += 1
+        
+        # Statistics tracking; the hall of fame keeps the best plan ever seen,
+        # which eaSimple-style generational replacement can otherwise lose
+        stats = _fitness_statistics()
+        hall_of_fame = tools.HallOfFame(1)
+        
+        # Run evolutionary algorithm (eaSimple with batched fitness evaluation)
+        cache_stats = None
+        if islands > 1:
+            population, logbook, stop_reason, cache_stats = self._evolve_islands(
+                population, islands, max(1, migration_interval), migrants,
+                cxpb=0.7, mutpb=0.3, ngen=generations, halloffame=hall_of_fame,
+                deadline=deadline, stagnation=stagnation_generations,
+                cancel_event=cancel_event,
+                on_generation=on_generation if on_progress else None,
+                local_search=(local_search_top_k, local_search_moves),
+                fitness_cache_size=fitness_cache_size
+            )
+        else:
+            population, logbook, stop_reason = self._evolve(
+                population,
+                cxpb=0.7,  # Crossover probability
+                mutpb=0.3,  # Mutation probability
+                ngen=generations,
+                stats=stats,
+                halloffame=hall_of_fame,
+                deadline=deadline,
+                stagnation=stagnation_generations,
+                cancel_event=cancel_event,
+                on_generation=on_generation if on_progress else None,
+                local_search=(local_search_top_k, local_search_moves)
+            )
+        generations_run = len(logbook) - 1
+        
+        # Extract best solution
+        best_individual = hall_of_fame[0]
+        best_fitness = best_individual.fitness.values[0]
+        best_genome = self._decode_genomes(np.array([best_individual], dtype=np.intp))[0]
+        
+        result = self._build_result(best_genome, best_fitness, generations_run, population_size, {
+            "bestFitness": float(best_fitness),
+            "avgFitness": float(logbook.select("avg")[-1]),
+            "minFitness": float(logbook.select("min")[-1]),
+            "convergenceData": [float(x) for x in logbook.select("max")],
+            "fitnessEvaluations": int(sum(logbook.select("nevals"))),
+            "timings": {
+                "selectionSeconds": round(sum(logbook.select("selectSeconds")), 6),
+                "variationSeconds": round(sum(logbook.select("varySeconds")), 6),
+                "evaluationSeconds": round(sum(logbook.select("evalSeconds")), 6),
+                "localSearchSeconds": round(sum(logbook.select("localSeconds")), 6),
+                "generationSeconds": [round(x, 6) for x in logbook.select("seconds")]
+            },
+            "localSearch": {
+                "topK": local_search_top_k,
+                "movesPerIndividual": local_search_moves,
+                "acceptedMoves": int(sum(logbook.select("localMoves")))
+            } if local_search_top_k else None,
+            "generationsRequested": generations,
+            "stopReason": stop_reason,
+            "elapsedMs": round((time.time() - started) * 1000, 1),
+            "fitnessCache": self._fitness_cache.stats() if self._fitness_cache else cache_stats,
+            "workers": self._workers,
+            "encoding": encoding,
+            "seededIndividuals": seeded,
+            "meanDomainSize": round(float(np.mean(np.diff(problem.domain_offsets))), 2),
+            "islands": {
+                "count": islands,
+                "migrationInterval": migration_interval,
+                "migrants": migrants
+            } if islands > 1 else None
+        })
+        
+        print(f"✅ Optimization complete! Score: {best_fitness:.1f}, "
+              f"Violations: {result['optimization_summary']['totalViolations']}, "
+              f"{generations_run} generations ({stop_reason})")
+        return result
+    
+    def _build_result(self, individual: List[int], fitness: float, generations: int,
+                      population_size: int, statistics: Dict) -> Dict:
+        """Assemble the assignments/optimization_summary/statistics response"""
+        problem = self.problem
+        
+        # Convert to readable format
+        assignments = self.build_assignments(individual)
         
         # Calculate summary statistics
         total_violations = sum(len(a["violations"]) for a in assignments)
         ready_trains = sum(1 for a in assignments if a["readiness"] == "ready")
         cleaning_matches = sum(1 for a in assignments 
                              if a["needsCleaning"] == a["cleaningAvailable"])
+        if self._previous_bays is not None:
+            previous = self._previous_bays
+            statistics["relocatedTrains"] = int(np.count_nonzero(
+                (previous >= 0) & (previous != np.asarray(individual))))
+            statistics["previousPlan"] = {"trains": self._previous_plan_size,
+                                          "matched": int(np.count_nonzero(previous >= 0))}
+        statistics["shuntingModel"] = "track_graph" if problem.has_track_graph else "distance"
+        statistics["capacityMode"] = self._capacity_mode
+        if self._capacity_mode == "lane":
+            statistics["laneOrder"] = "arrival_time" if problem.has_arrival_times else "departure"
         
-        result = {
+        return {
             "assignments": assignments,
             "optimization_summary": {
-                "objectiveScore": round(best_fitness, 2),
-                "totalTrains": len(self.trains),
-                "totalBays": len(self.depot_bays),
+                "objectiveScore": round(fitness, 2),
+                "totalTrains": problem.train_count,
+                "totalBays": problem.bay_count,
                 "generationsRun": generations,
                 "populationSize": population_size,
                 "totalViolations": total_violations,
                 "readyTrainsAssigned": ready_trains,
                 "cleaningRequirementMatches": cleaning_matches
             },
-            "statistics": {
-                "bestFitness": float(best_fitness),
-                "avgFitness": float(logbook.select("avg")[-1]),
-                "minFitness": float(logbook.select("min")[-1]),
-                "convergenceData": [float(x) for x in logbook.select("max")]
-            }
+            "statistics": statistics
         }
+    
+    def optimize_cpsat(self, time_limit_ms: int = 10000, hint: Optional[List[int]] = None,
+                       workers: int = 8) -> Dict:
+        """
+        Solve the stabling assignment exactly with OR-Tools CP-SAT
+        
+        Models the same objective as the GA fitness function: per-gene scores
+        from _gene_scores, an overcrowding term per extra train in a bay (or
+        the spilled trains, trains left without a cleaning slot and blocked
+        pairs in "lane" capacity mode) and a shunting term per (earlier,
+        later) departure pair parked in the wrong order, or with the later
+        train on the earlier one's exit path when the depot has a track
+        graph. Stops at time_limit_ms with the best plan found and reports
+        the optimality gap against the solver's bound.
+        
+        Args:
+            time_limit_ms: Wall-clock limit for the search
+            hint: Optional genome (e.g. the GA's best) used as a warm-start hint;
+                defaults to the previous plan, if one is set
+            workers: CP-SAT search workers
+            
+        Returns:
+            Dict in the same shape as optimize(), with statistics.solver details
+        """
+        if cp_model is None:
+            raise ValueError("CP-SAT engine unavailable: ortools is not installed")
+        
+        problem = self.problem
+        if hint is None:
+            hint = self.previous_genome()
+        weights = self._fitness_weights
+        trains, bays = range(problem.train_count), range(problem.bay_count)
+        gene_scores = self._gene_scores(np.arange(problem.train_count)[:, None],
+                                        np.arange(problem.bay_count)[None, :])
+        distances = problem.bay_distance_to_exit.tolist()
+        departures = problem.train_departure.tolist()
+        
+        print(f"🧮 Starting CP-SAT solve: {problem.train_count} trains, "
+              f"{problem.bay_count} bays, limit {time_limit_ms} ms")
+        
+        def coefficient(value: float) -> int:
+            # CP-SAT objectives are integral: scale so fractional weights and
+            # relocation penalties keep their effect
+            return int(round(value * CPSAT_OBJECTIVE_SCALE))
+        
+        model = cp_model.CpModel()
+        x = [[model.new_bool_var(f"x_{i}_{b}") for b in bays] for i in trains]
+        objective = []
+        
+        for i in trains:
+            model.add_exactly_one(x[i])
+            objective += [coefficient(gene_scores[i, b]) * x[i][b] for b in bays]
+        
+        if self._capacity_mode == "lane":
+            # Lanes packed by length in arrival order: spilled[i, b] is set
+            # exactly when train i fits bay b alone but not behind the earlier
+            # arrivals there, and swaps its gene score for the masked one
+            lengths, capacities = problem.train_length.tolist(), problem.bay_capacity.tolist()
+            arrival_ranks = problem.train_arrival_rank.tolist()
+            masked_scores = self._gene_scores(np.arange(problem.train_count)[:, None],
+                                              np.arange(problem.bay_count)[None, :],
+                                              np.ones(gene_scores.shape, dtype=bool))
+            unserved_scores = self._gene_scores(np.arange(problem.train_count)[:, None],
+                                                np.arange(problem.bay_count)[None, :],
+                                                unserved=np.ones(gene_scores.shape, dtype=bool))
+            slots_ready = problem.slots_ready(np.arange(problem.train_count)[:, None],
+                                              np.arange(problem.bay_count)[None, :])
+            wants_slot = (problem.train_needs_cleaning[:, None]
+                          & problem.cleaning_ok(np.arange(problem.train_count)[:, None],
+                                                np.arange(problem.bay_count)[None, :]))
+            by_arrival = sorted(trains, key=arrival_ranks.__getitem__)
+            for b in bays:
+                kept = []  # length terms of the trains that fit bay b, net of spills
+                spills = {}
+                arrived = 0
+                for k, i in enumerate(by_arrival):
+                    arrived += lengths[i]
+                    if lengths[i] > capacities[b]:
+                        continue  # too long for the bay anyway
+                    kept.append(lengths[i] * x[i][b])
+                    if arrived <= capacities[b]:
+                        continue  # the lane can never be full by then
+                    spilled = spills[i] = model.new_bool_var(f"spilled_{i}_{b}")
+                    filled = sum(lengths[j] * x[j][b] for j in by_arrival[:k + 1])
+                    model.add_implication(spilled, x[i][b])
+                    model.add(filled > capacities[b]).only_enforce_if(spilled)
+                    model.add(filled <= capacities[b]).only_enforce_if([x[i][b], spilled.Not()])
+                    objective.append(coefficient(masked_scores[i, b] - gene_scores[i, b])
+                                     * spilled)
+                    kept.append(-lengths[i] * spilled)
+                # Implied by the above, but it tightens the bound a lot: the
+                # trains that did not spill fit the lane together
+                model.add(sum(kept) <= capacities[b])
+                
+                # One train per cleaning slot: cleaned[i] marks the trains
+                # kept and cleaned in lane b. By Hall's theorem for slots
+                # nested by end time, they fit the slots iff at most r of
+                # them are due by the time r slots have ended, for every r
+                if not problem.has_cleaning_slots:
+                    continue
+                candidates = sorted((i for i in trains
+                                     if wants_slot[i, b] and lengths[i] <= capacities[b]),
+                                    key=lambda i: slots_ready[i, b])
+                levels = [(k + 1, int(slots_ready[i, b])) for k, i in enumerate(candidates)]
+                if all(due <= ready for due, ready in levels):
+                    continue  # never short of slots
+                cleaned = {}
+                for i in candidates:
+                    cleaned[i] = model.new_bool_var(f"cleaned_{i}_{b}")
+                    model.add_implication(cleaned[i], x[i][b])
+                    unserved = x[i][b] - cleaned[i]
+                    if i in spills:
+                        model.add_bool_or([cleaned[i].Not(), spills[i].Not()])
+                        unserved -= spills[i]
+                    objective.append(coefficient(unserved_scores[i, b] - gene_scores[i, b])
+                                     * unserved)
+                for k, (due, ready) in enumerate(levels):
+                    last_at_level = k + 1 == len(levels) or levels[k + 1][1] != ready
+                    if due > ready and last_at_level:
+                        model.add(sum(cleaned[i] for i in candidates[:k + 1]) <= ready)
+            # LIFO blocking between later arrivals and the earlier,
+            # earlier-departing trains behind them
+            for i in trains:
+                for j in trains:
+                    if arrival_ranks[i] < arrival_ranks[j] and departures[i] < departures[j]:
+                        lane_blocked = model.new_bool_var(f"lane_blocked_{i}_{j}")
+                        for b in bays:
+                            model.add(lane_blocked >= x[i][b] + x[j][b] - 1)
+                        objective.append(coefficient(weights['lane_blocking_penalty']) * lane_blocked)
+        else:
+            # Penalty for bay overcrowding (assuming 1 train per bay)
+            for b in bays:
+                excess = model.new_int_var(0, problem.train_count, f"excess_{b}")
+                model.add(excess >= sum(x[i][b] for i in trains) - 1)
+                objective.append(coefficient(weights['overcrowding_penalty']) * excess)
+        
+        # Shunting on the track graph: a later departure parked on an earlier
+        # departure's exit path
+        max_distance = max(distances)
+        if weights['shunting_penalty'] and problem.has_track_graph:
+            exit_paths = [(b, problem.exit_path(b)) for b in bays]
+            exit_paths = [(b, path) for b, path in exit_paths if path]
+            for i in trains:
+                for j in trains:
+                    if departures[i] < departures[j]:
+                        blocked = model.new_bool_var(f"shunt_{i}_{j}")
+                        for b, path in exit_paths:
+                            model.add(blocked >= x[i][b] + sum(x[j][a] for a in path) - 1)
+                        objective.append(coefficient(weights['shunting_penalty']) * blocked)
+        # Shunting: an earlier departure parked further from the exit than a later one
+        elif weights['shunting_penalty'] and max_distance > 0:
+            distance = [model.new_int_var(0, max_distance, f"distance_{i}") for i in trains]
+            for i in trains:
+                model.add(distance[i] == sum(distances[b] * x[i][b] for b in bays))
+            for i in trains:
+                for j in trains:
+                    if departures[i] < departures[j]:
+                        blocked = model.new_bool_var(f"shunt_{i}_{j}")
+                        model.add(distance[i] - distance[j] <= max_distance * blocked)
+                        objective.append(coefficient(weights['shunting_penalty']) * blocked)
+        
+        model.maximize(sum(objective))
+        
+        if hint is not None:
+            for i in trains:
+                for b in bays:
+                    model.add_hint(x[i][b], 1 if int(hint[i]) == b else 0)
+        
+        solver = cp_model.CpSolver()
+        solver.parameters.max_time_in_seconds = time_limit_ms / 1000
+        solver.parameters.num_workers = max(1, workers)
+        status = solver.solve(model)
+        
+        if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            raise ValueError(f"CP-SAT found no solution within {time_limit_ms} ms "
+                             f"(status {solver.status_name(status)})")
+        
+        genome = [next(b for b in bays if solver.boolean_value(x[i][b])) for i in trains]
+        objective_value = solver.objective_value / CPSAT_OBJECTIVE_SCALE
+        bound = solver.best_objective_bound / CPSAT_OBJECTIVE_SCALE
+        gap = abs(bound - objective_value) / max(1.0, abs(objective_value))
+        # Scored like every other engine, free of any coefficient rounding
+        fitness = float(self.evaluate_population(np.array([genome]))[0])
+        
+        result = self._build_result(genome, fitness, 0, 0, {
+            "bestFitness": float(fitness),
+            "solver": {
+                "engine": "cpsat",
+                "status": solver.status_name(status),
+                "objectiveValue": float(objective_value),
+                "objectiveBound": float(bound),
+                "optimalityGap": round(gap, 6),
+                "wallTimeSeconds": round(solver.wall_time, 3),
+                "warmStart": hint is not None
+            }
+        })
+        
+        print(f"✅ CP-SAT {solver.status_name(status)}: Score {fitness:.1f}, gap {gap:.2%}")
+        return result
+    
+    def reoptimize(self, time_limit_ms: int = 1000, max_passes: int = 20) -> Dict:
+        """
+        Short local re-optimization of the previous plan
+        
+        Starting from the plan set by set_previous_plan (or the greedy plan if
+        there is none), repeatedly moves single trains to the best bay in
+        their feasible domain, then swaps pairs of trains, using incremental
+        evaluation, until a pass finds no improvement, max_passes is reached
+        or time_limit_ms is spent. Meant for last-minute replans where only a
+        few trains changed readiness or departure time: each pass visits the
+        trains with the most to gain from a better bay first, so those are
+        handled well within the time limit on large fleets.
+        
+        Returns:
+            Dict in the same shape as optimize(), with statistics.localSearch details
+        """
+        if not self.trains or not self.depot_bays:
+            raise ValueError("Cannot optimize: no trains or bays loaded")
+        
+        problem = self.problem
+        started = time.time()
+        deadline = started + time_limit_ms / 1000
+        genome = self.previous_genome() or self.greedy_assignment()
+        evaluator = self.incremental_evaluator(genome)
+        start_score = evaluator.score
+        
+        # Best gene score each train could get, one domain at a time so large
+        # depots never materialize a trains x bays table
+        domain_best = np.array([self._gene_scores(i, problem.domain(i)).max()
+                                for i in range(problem.train_count)])
+        
+        print(f"🔧 Starting local re-optimization: {problem.train_count} trains, "
+              f"limit {time_limit_ms} ms")
+        
+        moves = passes = 0
+        stop_reason = "max_passes"
+        while passes < max_passes:
+            passes += 1
+            improved = False
+            slack = domain_best - np.array(evaluator.gene_scores)
+            order = np.argsort(-slack, kind="stable").tolist()
+            for train in order:
+                if time.time() >= deadline:
+                    break
+                current_bay, current = evaluator.genes[train], evaluator.raw_score
+                best_bay, best = current_bay, current
+                for bay in problem.domain(train):
+                    evaluator.move(train, int(bay))
+                    if evaluator.raw_score > best:
+                        best_bay, best = int(bay), evaluator.raw_score
+                evaluator.move(train, best_bay)
+                if best_bay != current_bay:
+                    moves += 1
+                    improved = True
+            
+            # Pairwise swaps cover moves that only pay off together
+            occupants: Dict[int, List[int]] = {}
+            for train, bay in enumerate(evaluator.genes):
+                occupants.setdefault(bay, []).append(train)
+            for train in order:
+                if time.time() >= deadline:
+                    break
+                for bay in problem.domain(train):
+                    bay = int(bay)
+                    own_bay = evaluator.genes[train]
+                    if bay == own_bay:
+                        continue
+                    for other in occupants.get(bay, ()):
+                        if not problem.in_domain(other, own_bay):
+                            continue
+                        current = evaluator.raw_score
+                        evaluator.swap(train, other)
+                        if evaluator.raw_score > current:
+                            occupants[own_bay].remove(train)
+                            occupants[bay].remove(other)
+                            occupants[bay].append(train)
+                            occupants[own_bay].append(other)
+                            moves += 1
+                            improved = True
+                            break
+                        evaluator.swap(train, other)
+                    else:
+                        continue
+                    break
+            
+            if time.time() >= deadline:
+                stop_reason = "time_limit"
+                break
+            if not improved:
+                stop_reason = "converged"
+                break
         
-        print(f"✅ Optimization complete! Score: {best_fitness:.1f}, Violations: {total_violations}")
+        fitness = evaluator.score
+        result = self._build_result(list(evaluator.genes), fitness, passes, 1, {
+            "bestFitness": float(fitness),
+            "stopReason": stop_reason,
+            "elapsedMs": round((time.time() - started) * 1000, 1),
+            "localSearch": {
+                "engine": "local",
+                "startFitness": float(start_score),
+                "passes": passes,
+                "movesApplied": moves,
+                "fromPreviousPlan": self._previous_bays is not None
+            }
+        })
+        
+        print(f"✅ Local re-optimization complete! Score {start_score:.1f} -> {fitness:.1f}, "
+              f"{moves} moves in {passes} passes ({stop_reason})")
         return result
 
 
+# Optimizer reused by a job worker process while the data it was sent stays the same
+_JOB_OPTIMIZER: Optional[StablingOptimizer] = None
+
+
+def _run_optimization_job(snapshots, fingerprint: str, params: Dict,
+                          cancel_event, progress=None) -> Dict:
+    """
+    Job worker entry point: run one optimization request in this process
+    
+    snapshots maps data fingerprints to pickled optimizers; the one for
+    fingerprint is only fetched when this process does not hold that data yet.
+    """
+    global _JOB_OPTIMIZER
+    if _JOB_OPTIMIZER is None or _JOB_OPTIMIZER.data_fingerprint() != fingerprint:
+        if _JOB_OPTIMIZER is not None:
+            _JOB_OPTIMIZER.close_pool()
+        _JOB_OPTIMIZER = None  # release the old data before unpickling the new
+        _JOB_OPTIMIZER = pickle.loads(snapshots[fingerprint])
+    return _run_optimization(_JOB_OPTIMIZER, params, cancel_event,
+                             progress.append if progress is not None else None)
+
+
+@dataclass
+class OptimizationJob:
+    """An optimization request submitted to the job queue"""
+    id: str
+    params: Dict
+    submitted_at: float
+    future: Future = field(repr=False)
+    cancel_event: object = field(repr=False)
+    progress: object = field(repr=False)  # shared list of per-generation events
+    status: str = "queued"  # queued, running, succeeded, failed, cancelled
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[Dict] = field(default=None, repr=False)
+    error: Optional[str] = None
+    fingerprint: Optional[str] = None  # data fingerprint of the solved problem
+    depot: Optional[str] = None  # registry depot id, when solving a depot
+    dataset: Optional[str] = None  # dataset id or "inline", when solving uploaded data
+
+    def summary(self) -> Dict:
+        """Job metadata without the result payload"""
+        return {
+            "jobId": self.id,
+            "status": self.status,
+            "engine": self.params.get("engine", "ga"),
+            "depot": self.depot,
+            "dataset": self.dataset,
+            "submittedAt": self.submitted_at,
+            "startedAt": self.started_at,
+            "finishedAt": self.finished_at,
+            "error": self.error
+        }
+
+
+class JobQueueFullError(Exception):
+    """Raised when the optimization job queue is at capacity"""
+
+
+class OptimizationJobManager:
+    """
+    Runs optimization requests in a pool of worker processes
+    
+    Solves never block the API event loop. Jobs can be polled or cancelled by
+    id; at most max_concurrent run at once, at most max_queued wait behind
+    them, and finished jobs are evicted result_ttl seconds after completion.
+    """
+    
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT_JOBS,
+                 max_queued: int = MAX_QUEUED_JOBS,
+                 result_ttl: float = JOB_RESULT_TTL_SECONDS,
+                 on_success: Optional[Callable[["OptimizationJob"], None]] = None):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queued = max(0, max_queued)
+        self.result_ttl = result_ttl
+        self._jobs: "OrderedDict[str, OptimizationJob]" = OrderedDict()
+        self._lock = threading.RLock()  # Future.cancel runs _finish synchronously
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._manager = None
+        self._snapshots = None  # manager dict: data fingerprint -> pickled optimizer
+        self._snapshot_order: "OrderedDict[str, None]" = OrderedDict()
+        self._on_success = on_success
+        self.finished = Counter()  # finished jobs by status
+    
+    def _ensure_started(self) -> None:
+        if self._executor is None:
+            # Started lazily from a request thread: forking the threaded API
+            # process could hand a job a lock some other thread was holding,
+            # so job processes come from a fork server (or are spawned)
+            if "forkserver" in multiprocessing.get_all_start_methods():
+                context = multiprocessing.get_context("forkserver")
+            else:
+                context = multiprocessing.get_context("spawn")
+            # The manager serves cancellation events shared with job processes
+            self._manager = context.Manager()
+            self._snapshots = self._manager.dict()
+            self._executor = ProcessPoolExecutor(max_workers=self.max_concurrent,
+                                                 mp_context=context)
+    
+    def submit(self, source: StablingOptimizer, params: Dict, depot: Optional[str] = None,
+               dataset: Optional[str] = None) -> OptimizationJob:
+        """
+        Queue an optimization of the data loaded in source
+        
+        The job process works on its own pickled copy of source, so jobs for
+        different problems never share state. source is pickled once per data
+        fingerprint and parked with the manager; job processes that already
+        hold that data never fetch it again.
+        """
+        with self._lock:
+            self._evict_expired()
+            if self.pending_count() >= self.max_concurrent + self.max_queued:
+                raise JobQueueFullError(
+                    f"Optimization queue is full ({self.max_queued} queued jobs)")
+            self._ensure_started()
+            
+            cancel_event = self._manager.Event()
+            progress = self._manager.list()
+            fingerprint = source.data_fingerprint()
+            self._store_snapshot(fingerprint, source)
+            future = self._executor.submit(_run_optimization_job, self._snapshots, fingerprint,
+                                           params, cancel_event, progress)
+            job = OptimizationJob(id=uuid.uuid4().hex, params=params, submitted_at=time.time(),
+                                  future=future, cancel_event=cancel_event,
+                                  progress=progress, fingerprint=fingerprint,
+                                  depot=depot, dataset=dataset)
+            self._jobs[job.id] = job
+        future.add_done_callback(lambda f, job=job: self._finish(job, f))
+        return job
+    
+    def _store_snapshot(self, fingerprint: str, source: StablingOptimizer) -> None:
+        """
+        Park a pickled copy of source for job processes, if not already there
+        
+        At most max_concurrent + max_queued snapshots are kept; the least
+        recently submitted ones that no pending job needs are dropped first.
+        """
+        if fingerprint not in self._snapshot_order:
+            self._snapshots[fingerprint] = pickle.dumps(source, pickle.HIGHEST_PROTOCOL)
+        self._snapshot_order[fingerprint] = None
+        self._snapshot_order.move_to_end(fingerprint)
+        needed = {job.fingerprint for job in self._jobs.values() if not job.future.done()}
+        needed.add(fingerprint)
+        for stale in [key for key in self._snapshot_order if key not in needed]:
+            if len(self._snapshot_order) <= self.max_concurrent + self.max_queued:
+                break
+            del self._snapshot_order[stale]
+            self._snapshots.pop(stale, None)
+    
+    def _finish(self, job: OptimizationJob, future: Future) -> None:
+        with self._lock:
+            job.finished_at = time.time()
+            if future.cancelled():
+                job.status = "cancelled"
+            elif future.exception() is not None:
+                job.status = "failed"
+                job.error = str(future.exception())
+            else:
+                job.result = future.result()
+                stop_reason = job.result.get("statistics", {}).get("stopReason")
+                job.status = "cancelled" if stop_reason == "cancelled" else "succeeded"
+            self.finished[job.status] += 1
+        if self._on_success is not None and job.status == "succeeded":
+            self._on_success(job)
+    
+    def _refresh(self, job: OptimizationJob) -> None:
+        if job.status == "queued" and job.future.running():
+            job.status = "running"
+            job.started_at = time.time()
+    
+    def get(self, job_id: str) -> Optional[OptimizationJob]:
+        """Look up a job by id, refreshing its status"""
+        with self._lock:
+            self._evict_expired()
+            job = self._jobs.get(job_id)
+            if job is not None:
+                self._refresh(job)
+            return job
+    
+    def list(self) -> List[OptimizationJob]:
+        """All jobs still retained, oldest first"""
+        with self._lock:
+            self._evict_expired()
+            for job in self._jobs.values():
+                self._refresh(job)
+            return list(self._jobs.values())
+    
+    def cancel(self, job_id: str) -> Optional[OptimizationJob]:
+        """
+        Cancel a job: queued jobs never start, running GA jobs stop at the next
+        generation and keep their best plan so far
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished_at is not None:
+                return job
+            if not job.future.cancel():
+                job.cancel_event.set()
+            return job
+    
+    def progress(self, job: OptimizationJob, start: int = 0) -> List[Dict]:
+        """Per-generation progress events of a job from index start on"""
+        try:
+            return job.progress[start:]
+        except (EOFError, OSError):  # manager already shut down
+            return []
+    
+    def pending_count(self) -> int:
+        """Jobs queued or running"""
+        return sum(1 for job in self._jobs.values() if job.finished_at is None)
+    
+    def stats(self) -> Dict:
+        """Queue depth and limits"""
+        jobs = self.list()
+        return {
+            "queued": sum(1 for job in jobs if job.status == "queued"),
+            "running": sum(1 for job in jobs if job.status == "running"),
+            "retained": len(jobs),
+            "maxConcurrent": self.max_concurrent,
+            "maxQueued": self.max_queued,
+            "resultTtlSeconds": self.result_ttl
+        }
+    
+    def _evict_expired(self) -> None:
+        now = time.time()
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished_at is not None and now - job.finished_at > self.result_ttl]
+        for job_id in expired:
+            del self._jobs[job_id]
+    
+    def shutdown(self) -> None:
+        """Cancel outstanding work and stop the worker processes"""
+        for job in self.list():
+            self.cancel(job.id)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._manager is not None:
+            self._manager.shutdown()
+            self._manager = None
+            self._snapshots = None
+            self._snapshot_order.clear()
+
+
+class ResultCache:
+    """
+    LRU cache of optimization responses, content-addressed by the loaded data
+    and the request
+    
+    Keys hash the data fingerprint, the fitness weights and the validated run
+    parameters (including the seed), so new data never serves a stale plan.
+    With a directory, entries are also written there as JSON and survive
+    restarts; the directory is pruned to the same size bound. Only files
+    named <32 hex digit key>.json count as entries, so a shared directory
+    keeps its other files.
+    """
+    
+    def __init__(self, max_size: int = RESULT_CACHE_SIZE, directory: Optional[str] = RESULT_CACHE_DIR):
+        self.max_size = max(0, max_size)
+        self.directory = directory
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._data: Dict[str, str] = {}  # key -> data fingerprint, for discard_data
+        self.hits = 0
+        self.misses = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+    
+    @staticmethod
+    def key(fingerprint: str, weights: Dict, params: Dict) -> str:
+        payload = json.dumps({"data": fingerprint, "weights": weights, "params": params},
+                             sort_keys=True)
+        return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+    
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+    
+    def get(self, key: str) -> Optional[Dict]:
+        """Copy of the cached response for key, or None"""
+        result = self._entries.get(key)
+        if result is not None:
+            self._entries.move_to_end(key)
+        elif self.directory and os.path.exists(self._path(key)):
+            try:
+                with open(self._path(key), 'r', encoding='utf-8') as f:
+                    result = json.load(f)
+            except (OSError, ValueError):
+                result = None
+            if result is not None:
+                self._remember(key, result)
+        
+        if result is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return copy.deepcopy(result)
+    
+    def put(self, key: str, result: Dict, fingerprint: Optional[str] = None) -> None:
+        """Store a copy of result under key, computed from the data with fingerprint"""
+        if self.max_size == 0:
+            return
+        result = copy.deepcopy(result)
+        self._remember(key, result)
+        if fingerprint is not None:
+            self._data[key] = fingerprint
+        if self.directory:
+            tmp_path = self._path(key) + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(result, f)
+            os.replace(tmp_path, self._path(key))
+            self._prune_directory()
+    
+    def _remember(self, key: str, result: Dict) -> None:
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            evicted, _ = self._entries.popitem(last=False)
+            self._data.pop(evicted, None)
+    
+    def _entry_paths(self) -> List[str]:
+        """Paths of the cache entry files in the directory, other files excluded"""
+        return [os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                if RESULT_FILE_PATTERN.match(name)]
+    
+    def _prune_directory(self) -> None:
+        paths = self._entry_paths()
+        if len(paths) > self.max_size:
+            paths.sort(key=os.path.getmtime)
+            for path in paths[:len(paths) - self.max_size]:
+                os.remove(path)
+    
+    def discard_data(self, fingerprint: str) -> int:
+        """Drop the entries stored for the data with fingerprint; returns how many"""
+        keys = [key for key, data in self._data.items() if data == fingerprint]
+        for key in keys:
+            self._entries.pop(key, None)
+            self._data.pop(key)
+            if self.directory and os.path.exists(self._path(key)):
+                os.remove(self._path(key))
+        return len(keys)
+    
+    def clear(self) -> None:
+        """Drop all entries, on disk too"""
+        self._entries.clear()
+        self._data.clear()
+        if self.directory:
+            for path in self._entry_paths():
+                os.remove(path)
+    
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxSize": self.max_size,
+            "directory": self.directory,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+class DatasetStore:
+    """
+    Problem datasets uploaded for /api/optimize, by dataset id
+    
+    Every dataset is its own StablingOptimizer, compiled once on upload, so
+    solves for different depots or scenarios never share mutable state. The
+    id is the data fingerprint: uploading the same data again returns the
+    same id. At most max_size datasets are kept, least recently used first out.
+    """
+    
+    def __init__(self, max_size: int = MAX_DATASETS):
+        self.max_size = max(1, max_size)
+        self._datasets: "OrderedDict[str, StablingOptimizer]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def add(self, payload: Dict) -> Tuple[str, StablingOptimizer]:
+        """Compile and keep a problem payload (see load_payload); returns its id"""
+        dataset = StablingOptimizer.from_payload(payload)
+        dataset_id = dataset.data_fingerprint()
+        with self._lock:
+            self._datasets[dataset_id] = self._datasets.get(dataset_id, dataset)
+            self._datasets.move_to_end(dataset_id)
+            while len(self._datasets) > self.max_size:
+                self._datasets.popitem(last=False)
+            return dataset_id, self._datasets[dataset_id]
+    
+    def get(self, dataset_id: str) -> Optional[StablingOptimizer]:
+        with self._lock:
+            dataset = self._datasets.get(dataset_id)
+            if dataset is not None:
+                self._datasets.move_to_end(dataset_id)
+            return dataset
+    
+    def remove(self, dataset_id: str) -> bool:
+        with self._lock:
+            return self._datasets.pop(dataset_id, None) is not None
+    
+    def list(self) -> List[Dict]:
+        """Summary of every kept dataset, least recently used first"""
+        with self._lock:
+            return [_dataset_summary(dataset_id, dataset)
+                    for dataset_id, dataset in self._datasets.items()]
+
+
+def _dataset_summary(dataset_id: str, dataset: StablingOptimizer) -> Dict:
+    return {
+        "dataset_id": dataset_id,
+        "trains": len(dataset.trains),
+        "depot_bays": len(dataset.depot_bays),
+        "cleaning_slots": len(dataset.cleaning_slots)
+    }
+
+
+def _file_stamp(path: str, previous: Optional[Tuple[int, int, str]] = None
+                ) -> Optional[Tuple[int, int, str]]:
+    """
+    (mtime_ns, size, content hash) of a data file, or None if it is missing
+    
+    The file is only read and hashed when its mtime or size differ from
+    previous, so an unchanged file costs one stat().
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    if previous is not None and previous[:2] == (stat.st_mtime_ns, stat.st_size):
+        return previous
+    with open(path, 'rb') as f:
+        digest = hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+    return stat.st_mtime_ns, stat.st_size, digest
+
+
+class DepotRegistry:
+    """
+    Depots by id, loaded lazily from a data directory
+    
+    Depot <id> lives in <directory>/<id>/ with depot_layout.json and
+    rakes.csv, plus optional cleaning_slots.csv and stabling_state.csv. It is
+    loaded and compiled on first use and kept in an LRU of at most
+    max_loaded depots; evicted depots are simply reloaded when next asked
+    for. The default depot (the files next to this module, loaded at
+    startup) is pinned and never evicted.
+    
+    Data files are hot reloaded: get() checks a depot's files at most every
+    check_interval seconds (see refresh), re-parses only the files whose
+    content changed and swaps in a newly compiled optimizer. Requests and
+    jobs already holding the old one keep using it undisturbed.
+    """
+    
+    WATCHED_FILES = ("depot_layout", "trains", "cleaning_slots")
+    
+    def __init__(self, default: StablingOptimizer, directory: str = DEPOTS_DIR,
+                 max_loaded: int = MAX_LOADED_DEPOTS,
+                 check_interval: float = RELOAD_CHECK_SECONDS,
+                 on_reload: Optional[Callable[[str, StablingOptimizer, StablingOptimizer], None]] = None):
+        self.default = default
+        self.directory = directory
+        self.max_loaded = max(1, max_loaded)
+        self.check_interval = check_interval
+        self.on_reload = on_reload  # called with (depot_id, previous, current) after a swap
+        self._loaded: "OrderedDict[str, StablingOptimizer]" = OrderedDict()
+        self._stamps: Dict[str, Dict[str, Optional[Tuple[int, int, str]]]] = {}
+        self._checked: Dict[str, float] = {}
+        self._lock = threading.RLock()
+        self.loads = 0
+        self.evictions = 0
+        self.reloads = 0
+    
+    def files(self, depot_id: str) -> Dict[str, str]:
+        """Data file paths of a depot"""
+        if depot_id == DEFAULT_DEPOT:
+            return {"depot_layout": DEPOT_FILE, "trains": RAKES_FILE,
+                    "cleaning_slots": CLEANING_FILE, "stabling_state": STATE_FILE}
+        folder = os.path.join(self.directory, depot_id)
+        return {"depot_layout": os.path.join(folder, "depot_layout.json"),
+                "trains": os.path.join(folder, "rakes.csv"),
+                "cleaning_slots": os.path.join(folder, "cleaning_slots.csv"),
+                "stabling_state": os.path.join(folder, "stabling_state.csv")}
+    
+    def depot_ids(self) -> List[str]:
+        """The default depot and every depot directory with a layout file"""
+        found = []
+        if os.path.isdir(self.directory):
+            found = sorted(name for name in os.listdir(self.directory)
+                           if DEPOT_ID_PATTERN.match(name) and name != DEFAULT_DEPOT
+                           and os.path.isfile(self.files(name)["depot_layout"]))
+        return [DEFAULT_DEPOT] + found
+    
+    def get(self, depot_id: Optional[str] = None) -> Optional[StablingOptimizer]:
+        """The compiled depot, loading it if needed; None if no such depot exists"""
+        if depot_id is None:
+            depot_id = DEFAULT_DEPOT
+        if not isinstance(depot_id, str) or not DEPOT_ID_PATTERN.match(depot_id):
+            raise ValueError(f"Invalid depot id: {depot_id!r}")
+        if self.check_interval > 0:
+            self.refresh(depot_id)
+        if depot_id == DEFAULT_DEPOT:
+            return self.default
+        with self._lock:
+            depot = self._loaded.get(depot_id)
+            if depot is None:
+                if not os.path.isfile(self.files(depot_id)["depot_layout"]):
+                    return None
+                depot = self._load(depot_id)
+                self._loaded[depot_id] = depot
+                while len(self._loaded) > self.max_loaded:
+                    evicted_id, evicted = self._loaded.popitem(last=False)
+                    self._stamps.pop(evicted_id, None)
+                    evicted.close_pool()
+                    self.evictions += 1
+            self._loaded.move_to_end(depot_id)
+            return depot
+    
+    def record_files(self, depot_id: str) -> None:
+        """Remember the current state of a depot's data files, as loaded"""
+        files = self.files(depot_id)
+        with self._lock:
+            self._stamps[depot_id] = {name: _file_stamp(files[name])
+                                      for name in self.WATCHED_FILES}
+            self._checked[depot_id] = time.monotonic()
+    
+    def refresh(self, depot_id: str, force: bool = False) -> List[str]:
+        """
+        Hot reload a loaded depot whose data files changed
+        
+        Skipped if the depot was checked less than check_interval seconds
+        ago, unless force. Files are compared by content hash, so touching
+        a file does not reload it. Only the changed files are re-parsed; the
+        depot is recompiled into a new optimizer and swapped in atomically,
+        then on_reload runs so dependent caches can be invalidated. If a
+        changed file does not parse, the previous data stays in service.
+        Returns the names of the files reloaded.
+        """
+        with self._lock:
+            current = self.default if depot_id == DEFAULT_DEPOT else self._loaded.get(depot_id)
+            stamps = self._stamps.get(depot_id)
+            now = time.monotonic()
+            if current is None or stamps is None:
+                return []
+            if not force and now - self._checked.get(depot_id, 0.0) < self.check_interval:
+                return []
+            self._checked[depot_id] = now
+            
+            files = self.files(depot_id)
+            fresh = {name: _file_stamp(files[name], stamps[name]) for name in self.WATCHED_FILES}
+            self._stamps[depot_id] = fresh
+            changed = [name for name in self.WATCHED_FILES
+                       if (fresh[name] and fresh[name][2]) != (stamps[name] and stamps[name][2])]
+            if not changed:
+                return []
+            try:
+                replacement = self._reload(depot_id, current, changed)
+            except ValueError as e:
+                print(f"⚠️  Keeping previous data for depot {depot_id}: {e}")
+                return []
+            
+            if depot_id == DEFAULT_DEPOT:
+                self.default = replacement
+            else:
+                self._loaded[depot_id] = replacement
+            self.reloads += 1
+        
+        current.close_pool()
+        print(f"🔄 Reloaded depot {depot_id}: {', '.join(changed)}")
+        if self.on_reload is not None:
+            self.on_reload(depot_id, current, replacement)
+        return changed
+    
+    def _reload(self, depot_id: str, current: StablingOptimizer,
+                changed: List[str]) -> StablingOptimizer:
+        """A new optimizer with current's data and the changed files re-parsed"""
+        files = self.files(depot_id)
+        depot = StablingOptimizer()
+        # Parsed records are never mutated, so unchanged files are shared
+        depot.depot_bays = dict(current.depot_bays)
+        depot.trains = list(current.trains)
+        depot.cleaning_slots = list(current.cleaning_slots)
+        depot.load_seconds = dict(current.load_seconds)
+        loaders = {"depot_layout": depot.load_depot_layout, "trains": depot.load_trains,
+                   "cleaning_slots": depot.load_cleaning_slots}
+        try:
+            for name in changed:
+                if name == "cleaning_slots" and not os.path.isfile(files[name]):
+                    depot.cleaning_slots = []
+                    continue
+                loaders[name](files[name])
+            depot.compile_problem()
+        except Exception as e:
+            raise ValueError(f"Failed to reload {', '.join(changed)}: {e}")
+        depot.state_file = (files["stabling_state"]
+                            if os.path.isfile(files["stabling_state"]) else None)
+        return depot
+    
+    def close(self) -> None:
+        """Stop the evaluation pools of every loaded depot"""
+        with self._lock:
+            for depot in [self.default, *self._loaded.values()]:
+                depot.close_pool()
+    
+    def _load(self, depot_id: str) -> StablingOptimizer:
+        files = self.files(depot_id)
+        self.record_files(depot_id)
+        depot = StablingOptimizer()
+        try:
+            depot.load_depot_layout(files["depot_layout"])
+            depot.load_trains(files["trains"])
+            if os.path.isfile(files["cleaning_slots"]):
+                depot.load_cleaning_slots(files["cleaning_slots"])
+            depot.compile_problem()
+        except Exception as e:
+            raise ValueError(f"Failed to load depot {depot_id}: {e}")
+        if os.path.isfile(files["stabling_state"]):
+            depot.state_file = files["stabling_state"]
+        self.loads += 1
+        print(f"🏭 Loaded depot {depot_id}: {len(depot.trains)} trains, "
+              f"{len(depot.depot_bays)} bays")
+        return depot
+    
+    def is_loaded(self, depot_id: str) -> bool:
+        return depot_id == DEFAULT_DEPOT or depot_id in self._loaded
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "loaded": [DEFAULT_DEPOT] + list(self._loaded),
+                "maxLoaded": self.max_loaded,
+                "directory": self.directory,
+                "loads": self.loads,
+                "evictions": self.evictions,
+                "reloads": self.reloads,
+                "reloadCheckSeconds": self.check_interval
+            }
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style"""
+    
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+    
+    def observe(self, value: float) -> None:
+        for k, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[k] += 1
+        self.count += 1
+        self.sum += value
+
+
+def _prometheus_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+               for v in labels.values())
+    return "{" + ",".join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + "}"
+
+
+class OptimizerMetrics:
+    """
+    Run metrics for /api/metrics, in the Prometheus text exposition format
+    
+    Runs execute in job worker processes, so metrics are taken from the
+    statistics of each finished result (observe_run) rather than from
+    counters inside the GA loop. Live state (jobs, caches, data loads) is
+    read when rendering.
+    """
+    
+    GENERATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+    RUN_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.runs = Counter()  # (engine, stop reason) -> runs
+        self.evaluations = 0
+        self.phase_seconds = Counter()  # selection/variation/evaluation/local_search
+        self.fitness_cache = Counter()  # hits/misses
+        self.generation_seconds = Histogram(self.GENERATION_BUCKETS)
+        self.run_seconds = Histogram(self.RUN_BUCKETS)
+    
+    def observe_run(self, result: Dict) -> None:
+        """Record the statistics of one finished optimization"""
+        statistics = result.get("statistics", {})
+        if "solver" in statistics:
+            engine = "cpsat"
+        elif "localSearch" in statistics and "fitnessEvaluations" not in statistics:
+            engine = "local"
+        else:
+            engine = "ga"
+        
+        with self._lock:
+            self.runs[(engine, statistics.get("stopReason") or "completed")] += 1
+            self.evaluations += statistics.get("fitnessEvaluations", 0)
+            elapsed_ms = statistics.get("elapsedMs")
+            if elapsed_ms is None and "solver" in statistics:
+                elapsed_ms = statistics["solver"]["wallTimeSeconds"] * 1000
+            if elapsed_ms is not None:
+                self.run_seconds.observe(elapsed_ms / 1000)
+            
+            timings = statistics.get("timings") or {}
+            for phase, key in (("selection", "selectionSeconds"), ("variation", "variationSeconds"),
+                               ("evaluation", "evaluationSeconds"),
+                               ("local_search", "localSearchSeconds")):
+                self.phase_seconds[phase] += timings.get(key, 0.0)
+            for seconds in timings.get("generationSeconds", ()):
+                self.generation_seconds.observe(seconds)
+            
+            cache = statistics.get("fitnessCache") or {}
+            self.fitness_cache["hits"] += cache.get("hits", 0)
+            self.fitness_cache["misses"] += cache.get("misses", 0)
+    
+    def render(self, source: "StablingOptimizer", job_manager: "OptimizationJobManager",
+               results: "ResultCache") -> str:
+        """Prometheus text exposition of all metrics"""
+        lines = []
+        
+        def metric(name: str, kind: str, help_text: str, samples) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{_prometheus_labels(labels)} {value}")
+        
+        def histogram(name: str, help_text: str, hist: Histogram) -> None:
+            samples = [({"le": repr(float(bound))}, count)
+                       for bound, count in zip(hist.buckets, hist.counts)]
+            samples.append(({"le": "+Inf"}, hist.count))
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, value in samples:
+                lines.append(f"{name}_bucket{_prometheus_labels(labels)} {value}")
+            lines.append(f"{name}_sum {hist.sum}")
+            lines.append(f"{name}_count {hist.count}")
+        
+        def ratio(hits: int, misses: int) -> float:
+            return hits / (hits + misses) if hits + misses else 0.0
+        
+        with self._lock:
+            metric("optimizer_runs_total", "counter", "Finished optimization runs",
+                   [({"engine": engine, "stop_reason": reason}, count)
+                    for (engine, reason), count in sorted(self.runs.items())])
+            metric("optimizer_fitness_evaluations_total", "counter",
+                   "Fitness evaluations performed by GA runs", [({}, self.evaluations)])
+            metric("optimizer_phase_seconds_total", "counter",
+                   "GA time spent per phase",
+                   [({"phase": phase}, self.phase_seconds[phase])
+                    for phase in ("selection", "variation", "evaluation", "local_search")])
+            histogram("optimizer_generation_seconds", "Wall time per GA generation",
+                      self.generation_seconds)
+            histogram("optimizer_run_seconds", "Wall time per optimization run", self.run_seconds)
+            metric("optimizer_fitness_cache_lookups_total", "counter",
+                   "Fitness cache lookups across runs",
+                   [({"result": "hit"}, self.fitness_cache["hits"]),
+                    ({"result": "miss"}, self.fitness_cache["misses"])])
+            metric("optimizer_fitness_cache_hit_ratio", "gauge",
+                   "Fitness cache hit ratio across runs",
+                   [({}, ratio(self.fitness_cache["hits"], self.fitness_cache["misses"]))])
+        
+        cache = results.stats()
+        metric("optimizer_result_cache_lookups_total", "counter", "Result cache lookups",
+               [({"result": "hit"}, cache["hits"]), ({"result": "miss"}, cache["misses"])])
+        metric("optimizer_result_cache_hit_ratio", "gauge", "Result cache hit ratio",
+               [({}, cache["hitRate"])])
+        metric("optimizer_result_cache_entries", "gauge", "Responses held in the result cache",
+               [({}, cache["size"])])
+        
+        queue = job_manager.stats()
+        metric("optimizer_jobs", "gauge", "Optimization jobs by state",
+               [({"state": "running"}, queue["running"]), ({"state": "queued"}, queue["queued"])])
+        metric("optimizer_jobs_max", "gauge", "Job queue limits",
+               [({"limit": "concurrent"}, queue["maxConcurrent"]),
+                ({"limit": "queued"}, queue["maxQueued"])])
+        metric("optimizer_jobs_finished_total", "counter", "Finished jobs by status",
+               [({"status": status}, count)
+                for status, count in sorted(job_manager.finished.items())])
+        
+        metric("optimizer_data_load_seconds", "gauge", "Duration of the last load per data file",
+               [({"file": name}, seconds) for name, seconds in sorted(source.load_seconds.items())])
+        metric("optimizer_data_items", "gauge", "Loaded data items",
+               [({"kind": "trains"}, len(source.trains)),
+                ({"kind": "depot_bays"}, len(source.depot_bays)),
+                ({"kind": "cleaning_slots"}, len(source.cleaning_slots))])
+        return "\n".join(lines) + "\n"
+
+
 # FastAPI Application Setup
 app = FastAPI(
     title="Railway Stabling Optimization API",
@@ -432,8 +3485,62 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Global optimizer instance
+# Global optimizer instance, holding the default depot
 optimizer = StablingOptimizer()
+optimizer.state_file = STATE_FILE
+
+# Depots served by this process, by depot id
+depots = DepotRegistry(optimizer)
+
+# Problem datasets uploaded through /api/datasets
+datasets = DatasetStore()
+
+# Assignments {train_id: bay_id} of the last finished run per data fingerprint,
+# for previous_plan="last"; job completion callbacks update it from their own
+# thread, so every access holds last_plans_lock
+last_plans: "OrderedDict[str, Dict[str, str]]" = OrderedDict()
+last_plans_lock = threading.Lock()
+
+
+def _remember_plan(fingerprint: str, result: Dict) -> None:
+    """Keep the assignments of a finished run as the "last" previous_plan for its data"""
+    plan = {a["trainId"]: a["bayId"] for a in result["assignments"]}
+    with last_plans_lock:
+        last_plans[fingerprint] = plan
+        last_plans.move_to_end(fingerprint)
+        while len(last_plans) > MAX_DATASETS + 1:
+            last_plans.popitem(last=False)
+
+
+# Metrics exposed on /api/metrics
+metrics = OptimizerMetrics()
+
+
+def _record_run(job: OptimizationJob) -> None:
+    """Job completion hook: remember the plan and record its metrics"""
+    _remember_plan(job.fingerprint, job.result)
+    metrics.observe_run(job.result)
+
+
+# Background optimization jobs
+jobs = OptimizationJobManager(on_success=_record_run)
+
+# Responses of identical /api/optimize requests on unchanged data
+result_cache = ResultCache()
+
+
+def _on_depot_reload(depot_id: str, previous: StablingOptimizer,
+                     current: StablingOptimizer) -> None:
+    """Hot reload hook: drop results of the replaced data and carry its last plan over"""
+    stale, fresh = previous.data_fingerprint(), current.data_fingerprint()
+    result_cache.discard_data(stale)
+    with last_plans_lock:
+        if stale in last_plans:
+            # Still a good warm start: trains and bays that are gone are ignored
+            last_plans[fresh] = last_plans.pop(stale)
+
+
+depots.on_reload = _on_depot_reload
 
 
 @app.on_event("startup")
@@ -442,25 +3549,28 @@ async def startup_event():
     print("🚄 Starting Railway Stabling Optimization API...")
     
     required_files = [
-        ("depot_layout.json", "depot layout"),
-        ("rakes.csv", "train data"),
-        ("cleaning_slots.csv", "cleaning schedule")
+        (DEPOT_FILE, "depot layout"),
+        (RAKES_FILE, "train data"),
+        (CLEANING_FILE, "cleaning schedule")
     ]
     
-    for filename, description in required_files:
+    depots.record_files(DEFAULT_DEPOT)
+    for path, description in required_files:
+        filename = os.path.basename(path)
         try:
-            if filename == "depot_layout.json":
-                optimizer.load_depot_layout(filename)
-            elif filename == "rakes.csv":
-                optimizer.load_trains(filename)
-            elif filename == "cleaning_slots.csv":
-                optimizer.load_cleaning_slots(filename)
+            if path == DEPOT_FILE:
+                optimizer.load_depot_layout(path)
+            elif path == RAKES_FILE:
+                optimizer.load_trains(path)
+            elif path == CLEANING_FILE:
+                optimizer.load_cleaning_slots(path)
                 
         except Exception as e:
             print(f"❌ Failed to load {description} from {filename}: {e}")
             print(f"   Please ensure {filename} exists in the application directory")
     
     if optimizer.trains and optimizer.depot_bays:
+        optimizer.compile_problem()
         print("✅ All required data loaded successfully")
         print(f"📊 System ready: {len(optimizer.trains)} trains, "
               f"{len(optimizer.depot_bays)} bays, {len(optimizer.cleaning_slots)} cleaning slots")
@@ -468,6 +3578,13 @@ async def startup_event():
         print("⚠️  System started with incomplete data - some endpoints may not function")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop evaluation and job worker processes"""
+    depots.close()
+    jobs.shutdown()
+
+
 # API ENDPOINTS
 
 @app.get("/", summary="API Status")
@@ -482,65 +3599,486 @@ async def root():
 
 
 @app.get("/api/status", summary="System Status")
-async def get_status():
-    """Get detailed system status and loaded data counts"""
+async def get_status(depot: Optional[str] = None):
+    """Get detailed system status and loaded data counts (of the default depot, or depot)"""
+    source = _depot(depot)
     return {
         "status": "operational",
+        "depot": depot or DEFAULT_DEPOT,
         "data_loaded": {
-            "trains": len(optimizer.trains),
-            "depot_bays": len(optimizer.depot_bays),
-            "cleaning_slots": len(optimizer.cleaning_slots)
+            "trains": len(source.trains),
+            "depot_bays": len(source.depot_bays),
+            "cleaning_slots": len(source.cleaning_slots)
         },
-        "ready_for_optimization": bool(optimizer.trains and optimizer.depot_bays)
+        "ready_for_optimization": bool(source.trains and source.depot_bays),
+        "depots": depots.stats(),
+        "datasets": len(datasets.list()),
+        "result_cache": result_cache.stats()
     }
 
 
+def _depot(depot_id: Optional[str]) -> StablingOptimizer:
+    """The registry's optimizer for a depot request parameter (None: default depot)"""
+    try:
+        depot = depots.get(depot_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if depot is None:
+        raise HTTPException(status_code=404, detail=f"Depot not found: {depot_id}")
+    return depot
+
+
+def _resolve_source(request: Optional[Dict]) -> Tuple[StablingOptimizer, Dict[str, str]]:
+    """
+    The optimizer holding the data a request solves, and where it came from
+    
+    "problem" solves an inline payload (see StablingOptimizer.load_payload)
+    in a fresh optimizer, "dataset_id" an uploaded dataset and "depot" a
+    depot of the registry; with none of them, the default depot. The origin
+    is {"dataset": ...} or {"depot": ...}, as recorded on jobs.
+    """
+    request = request or {}
+    payload, dataset_id = request.get("problem"), request.get("dataset_id")
+    depot_id = request.get("depot")
+    if sum(value is not None for value in (payload, dataset_id, depot_id)) > 1:
+        raise HTTPException(status_code=400,
+                          detail="Give at most one of problem, dataset_id and depot")
+    if payload is not None:
+        try:
+            return StablingOptimizer.from_payload(payload), {"dataset": "inline"}
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    if dataset_id is not None:
+        dataset = datasets.get(str(dataset_id))
+        if dataset is None:
+            raise HTTPException(status_code=404, detail=f"Dataset not found: {dataset_id}")
+        return dataset, {"dataset": str(dataset_id)}
+    source = _depot(depot_id)
+    if not (source.trains and source.depot_bays):
+        raise HTTPException(status_code=400, detail="Cannot optimize: no trains or bays loaded")
+    return source, {"depot": depot_id or DEFAULT_DEPOT}
+
+
+def _resolve_previous_plan(previous_plan, source: StablingOptimizer) -> Optional[Dict[str, str]]:
+    """
+    Turn the previous_plan request field into {train_id: bay_id}
+    
+    Accepts "state" (the current stabling state file of a depot), "last"
+    (the last plan this API returned for the same data), a list of
+    assignment records with trainId/bayId or a {train_id: bay_id} mapping.
+    A plan that places none of source's trains in one of its bays is
+    rejected rather than silently ignored.
+    """
+    if previous_plan is None:
+        return None
+    plan = _parse_previous_plan(previous_plan, source)
+    if source.trains and source.depot_bays and not (source.match_previous_plan(plan) >= 0).any():
+        raise HTTPException(status_code=400,
+                          detail=f"previous_plan places none of the {len(source.trains)} loaded "
+                                 f"trains in a known bay ({len(plan)} entries given)")
+    return plan
+
+
+def _parse_previous_plan(previous_plan, source: StablingOptimizer) -> Dict[str, str]:
+    if previous_plan == "state":
+        if source.state_file is None:
+            raise HTTPException(status_code=400,
+                              detail="previous_plan 'state' needs a depot with a stabling state file")
+        try:
+            return source.load_stabling_state(source.state_file)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    if previous_plan == "last":
+        with last_plans_lock:
+            plan = last_plans.get(source.data_fingerprint())
+        if plan is None:
+            raise HTTPException(status_code=400, detail="No previous plan to start from yet")
+        return dict(plan)
+    if isinstance(previous_plan, dict):
+        return {str(k): str(v) for k, v in previous_plan.items()}
+    if isinstance(previous_plan, list):
+        try:
+            return {str(a["trainId"]): str(a["bayId"]) for a in previous_plan}
+        except (KeyError, TypeError):
+            raise HTTPException(status_code=400,
+                              detail="previous_plan records need trainId and bayId")
+    raise HTTPException(status_code=400,
+                      detail="previous_plan must be 'state', 'last', a list or a mapping")
+
+
+def _optimization_params(request: Optional[Dict], source: StablingOptimizer) -> Dict:
+    """Validate an /api/optimize request body into run parameters for source's data"""
+    request = request or {}
+    params = {
+        "engine": request.get("engine", "ga"),
+        "generations": request.get("generations", 50),
+        "population_size": request.get("population_size", 100),
+        "fitness_cache_size": request.get("fitness_cache_size", 0),
+        "workers": request.get("workers", 1),
+        "islands": request.get("islands", 1),
+        "migration_interval": request.get("migration_interval", 10),
+        "migrants": request.get("migrants", 2),
+        "time_limit_ms": request.get("time_limit_ms"),
+        "warm_start": bool(request.get("warm_start", False)),
+        "seed_fraction": request.get("seed_fraction", 0.0),
+        "encoding": request.get("encoding", "assignment"),
+        "stagnation_generations": request.get("stagnation_generations", 0),
+        "seed": request.get("seed"),
+        "previous_plan": _resolve_previous_plan(request.get("previous_plan"), source),
+        "relocation_penalty": request.get("relocation_penalty", 0.0),
+        "local_search_top_k": request.get("local_search_top_k", 0),
+        "local_search_moves": request.get("local_search_moves", 50),
+        "capacity_mode": request.get("capacity_mode", "single"),
+    }
+    
+    # Validate parameters (bool is an int subclass, but true is not a count)
+    for name in INTEGER_PARAMS + NUMBER_PARAMS:
+        value = params[name]
+        if value is None and name in OPTIONAL_PARAMS:
+            continue
+        types = int if name in INTEGER_PARAMS else (int, float)
+        if isinstance(value, bool) or not isinstance(value, types):
+            kind = "an integer" if name in INTEGER_PARAMS else "a number"
+            raise HTTPException(status_code=400, detail=f"{name} must be {kind}")
+    if params["engine"] not in ("ga", "cpsat", "local"):
+        raise HTTPException(status_code=400, detail="engine must be 'ga', 'cpsat' or 'local'")
+    if not (10 <= params["generations"] <= 500):
+        raise HTTPException(status_code=400, 
+                          detail="generations must be between 10 and 500")
+    if not (20 <= params["population_size"] <= 1000):
+        raise HTTPException(status_code=400,
+                          detail="population_size must be between 20 and 1000")
+    if not (0 <= params["fitness_cache_size"] <= 1_000_000):
+        raise HTTPException(status_code=400,
+                          detail="fitness_cache_size must be between 0 and 1000000")
+    if not (1 <= params["workers"] <= (os.cpu_count() or 1)):
+        raise HTTPException(status_code=400,
+                          detail=f"workers must be between 1 and {os.cpu_count() or 1}")
+    max_islands = min(os.cpu_count() or 1, params["population_size"] // 2)
+    if not (1 <= params["islands"] <= max_islands):
+        raise HTTPException(status_code=400,
+                          detail=f"islands must be between 1 and {max_islands} "
+                                 f"(CPU count and population_size / 2)")
+    if not (1 <= params["migration_interval"] <= params["generations"]):
+        raise HTTPException(status_code=400,
+                          detail="migration_interval must be between 1 and generations")
+    if not (0 <= params["migrants"] <= params["population_size"] // (2 * params["islands"])):
+        raise HTTPException(status_code=400,
+                          detail="migrants must be at most half of each island's population")
+    if params["time_limit_ms"] is not None and not (100 <= params["time_limit_ms"] <= 600_000):
+        raise HTTPException(status_code=400,
+                          detail="time_limit_ms must be between 100 and 600000")
+    if not (0 <= params["stagnation_generations"] <= params["generations"]):
+        raise HTTPException(status_code=400,
+                          detail="stagnation_generations must be between 0 and generations")
+    if not (0.0 <= params["seed_fraction"] <= 1.0):
+        raise HTTPException(status_code=400,
+                          detail="seed_fraction must be between 0 and 1")
+    if not (0 <= params["local_search_top_k"] <= params["population_size"]):
+        raise HTTPException(status_code=400,
+                          detail="local_search_top_k must be between 0 and population_size")
+    if not (1 <= params["local_search_moves"] <= 10_000):
+        raise HTTPException(status_code=400,
+                          detail="local_search_moves must be between 1 and 10000")
+    if not (0.0 <= params["relocation_penalty"] <= 1000.0):
+        raise HTTPException(status_code=400,
+                          detail="relocation_penalty must be between 0 and 1000")
+    if params["encoding"] not in GENOME_ENCODINGS:
+        raise HTTPException(status_code=400,
+                          detail="encoding must be 'assignment' or 'permutation'")
+    if params["capacity_mode"] not in CAPACITY_MODES:
+        raise HTTPException(status_code=400,
+                          detail="capacity_mode must be 'single' or 'lane'")
+    return params
+
+
+def _run_optimization(target: StablingOptimizer, params: Dict, cancel_event=None,
+                      on_progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+    """Run the engine selected in validated request parameters"""
+    if params["seed"] is not None:
+        random.seed(params["seed"])
+        np.random.seed(params["seed"] % 2 ** 32)
+    if target.trains and target.depot_bays:
+        target.set_previous_plan(params["previous_plan"], params["relocation_penalty"])
+    target.set_capacity_mode(params["capacity_mode"])
+    if params["engine"] == "local":
+        return target.reoptimize(time_limit_ms=params["time_limit_ms"] or 1000)
+    
+    ga_options = dict(
+        generations=params["generations"],
+        population_size=params["population_size"],
+        fitness_cache_size=params["fitness_cache_size"],
+        workers=params["workers"],
+        islands=params["islands"],
+        migration_interval=params["migration_interval"],
+        migrants=params["migrants"],
+        seed_fraction=params["seed_fraction"],
+        encoding=params["encoding"],
+        stagnation_generations=params["stagnation_generations"],
+        time_limit_ms=params["time_limit_ms"],
+        cancel_event=cancel_event,
+        on_progress=on_progress,
+        local_search_top_k=params["local_search_top_k"],
+        local_search_moves=params["local_search_moves"]
+    )
+    if params["engine"] == "ga":
+        return target.optimize(**ga_options)
+    
+    hint = None
+    if params["warm_start"]:
+        ga_result = target.optimize(**ga_options)
+        hint = target.assignment_genome(ga_result["assignments"])
+    return target.optimize_cpsat(time_limit_ms=params["time_limit_ms"] or 10000, hint=hint,
+                                 workers=params["workers"])
+
+
 @app.post("/api/optimize", summary="Run Optimization")
 async def optimize_stabling(request: Optional[Dict] = None):
     """
-    Run the genetic algorithm optimization
+    Run the genetic algorithm optimization, or the exact CP-SAT solver
     
     Request body (optional):
     {
+        "depot": null,
+        "engine": "ga",
         "generations": 50,
-        "population_size": 100
+        "population_size": 100,
+        "fitness_cache_size": 0,
+        "workers": 1,
+        "islands": 1,
+        "migration_interval": 10,
+        "migrants": 2,
+        "time_limit_ms": null,
+        "stagnation_generations": 0,
+        "warm_start": false,
+        "seed_fraction": 0.0,
+        "encoding": "assignment",
+        "seed": null,
+        "use_cache": true,
+        "previous_plan": null,
+        "relocation_penalty": 0.0,
+        "local_search_top_k": 0,
+        "local_search_moves": 50,
+        "capacity_mode": "single"
     }
+    
+    time_limit_ms is a wall-clock budget: the GA returns its best plan so far
+    once it is spent, and stagnation_generations stops it after that many
+    generations without improvement. statistics.stopReason says which
+    applied. With "engine": "cpsat", time_limit_ms (default 10000) bounds the
+    solve and warm_start first runs the GA with the other parameters to hint
+    the solver.
+    seed_fraction builds that share of the initial GA population with the
+    greedy constructive heuristic instead of uniformly random bays.
+    "encoding": "permutation" evolves permutations of bay slots with PMX
+    crossover and swap mutation, so trains never collide in a bay.
+    seed makes the GA reproducible. Identical requests on unchanged data are
+    answered from the result cache ("cached": true) unless use_cache is false.
+    previous_plan ("state", "last", assignment records or {trainId: bayId})
+    seeds the GA or hints CP-SAT; relocation_penalty is subtracted for each
+    train moved away from it. "engine": "local" instead runs a short local
+    search from that plan (time_limit_ms, default 1000) for fast replans.
+    A plan placing none of the loaded trains is a 400; statistics.previousPlan
+    reports how many of its trains were matched.
+    local_search_top_k > 0 makes the GA memetic: after every generation the
+    best local_search_top_k individuals are hill-climbed with up to
+    local_search_moves incremental moves and swaps each.
+    "capacity_mode": "lane" packs several trains per bay by length, with
+    LIFO blocking penalised; trains enter lanes in the order of their
+    optional arrival_time (rakes.csv column or train field), or latest
+    departure first when no train has one. Assignments then carry
+    lanePosition and blockedBy.
+    By default the default depot is solved; "depot" picks another depot of
+    the registry (see /api/depots). "problem": {"bays": [...], "trains": [...],
+    "cleaning_slots": [...]} solves inline data instead (fields as in
+    depot_layout.json, rakes.csv and cleaning_slots.csv), and "dataset_id" a
+    dataset uploaded to /api/datasets. Each solve runs on its own copy of the
+    problem, so concurrent requests never interfere.
     """
     try:
-        # Extract parameters with defaults
-        generations = 50
-        population_size = 100
+        source, origin = _resolve_source(request)
+        params = _optimization_params(request, source)
+        use_cache = bool((request or {}).get("use_cache", True))
+        fingerprint = source.data_fingerprint()
+        cache_key = ResultCache.key(fingerprint, source._fitness_weights, params)
+        if use_cache:
+            cached = result_cache.get(cache_key)
+            if cached is not None:
+                _remember_plan(fingerprint, cached)
+                cached["cached"] = True
+                return cached
         
-        if request:
-            generations = request.get("generations", 50)
-            population_size = request.get("population_size", 100)
-            
-            # Validate parameters
-            if not (10 <= generations <= 500):
-                raise HTTPException(status_code=400, 
-                                  detail="generations must be between 10 and 500")
-            if not (20 <= population_size <= 1000):
-                raise HTTPException(status_code=400,
-                                  detail="population_size must be between 20 and 1000")
-        
-        result = optimizer.optimize(
-            generations=generations,
-            population_size=population_size
-        )
+        # Solve in a job worker process so other endpoints stay responsive
+        job = jobs.submit(source, params, **origin)
+        result = await asyncio.wrap_future(job.future)
         
+        if result["statistics"].get("stopReason") != "cancelled":
+            result_cache.put(cache_key, result, fingerprint)
+        result["cached"] = False
         return result
         
+    except HTTPException:
+        raise
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Optimization failed: {str(e)}")
 
 
+@app.get("/api/metrics", summary="Optimizer Metrics", response_class=PlainTextResponse)
+async def get_metrics(depot: Optional[str] = None):
+    """
+    Optimizer metrics in the Prometheus text exposition format
+    
+    Fitness evaluations, per-generation wall-time histograms, time split
+    between selection/variation/evaluation/local search, fitness and result
+    cache hit ratios, active/queued jobs and data-load durations (of the
+    default depot, or depot).
+    """
+    return PlainTextResponse(metrics.render(_depot(depot), jobs, result_cache),
+                             media_type="text/plain; version=0.0.4")
+
+
+@app.post("/api/jobs", summary="Submit Optimization Job", status_code=202)
+async def submit_job(request: Optional[Dict] = None):
+    """
+    Queue an optimization and return its job id immediately
+    
+    Accepts the same request body as /api/optimize. Poll /api/jobs/{job_id}
+    for the result.
+    """
+    source, origin = _resolve_source(request)
+    params = _optimization_params(request, source)
+    try:
+        job = jobs.submit(source, params, **origin)
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return job.summary()
+
+
+@app.get("/api/jobs", summary="List Optimization Jobs")
+async def list_jobs():
+    """List retained jobs and the queue depth"""
+    return {
+        "jobs": [job.summary() for job in jobs.list()],
+        "queue": jobs.stats()
+    }
+
+
+@app.get("/api/jobs/{job_id}", summary="Get Optimization Job")
+async def get_job(job_id: str):
+    """Job status, plus the optimization result once it has finished"""
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    progress = jobs.progress(job, -1)
+    return {**job.summary(), "progress": progress[0] if progress else None,
+            "result": job.result}
+
+
+@app.get("/api/jobs/{job_id}/events", summary="Stream Optimization Progress")
+async def stream_job_events(job_id: str, request: Request):
+    """
+    Server-Sent Events stream of a job's GA progress
+    
+    Emits one "progress" event per generation (generation, max/avg/min
+    fitness, violations of the best plan, elapsed time), starting with the
+    generations already run, then a final "done" event with the job summary.
+    Fetch /api/jobs/{job_id} for the result; DELETE it to cut the run short.
+    """
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    
+    async def events():
+        sent = 0
+        while not await request.is_disconnected():
+            finished = job.finished_at is not None
+            for event in jobs.progress(job, sent):
+                sent += 1
+                yield f"event: progress\ndata: {json.dumps(event)}\n\n"
+            if finished:
+                yield f"event: done\ndata: {json.dumps((jobs.get(job_id) or job).summary())}\n\n"
+                return
+            await asyncio.sleep(PROGRESS_POLL_SECONDS)
+    
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
+
+
+@app.delete("/api/jobs/{job_id}", summary="Cancel Optimization Job")
+async def cancel_job(job_id: str):
+    """Cancel a queued or running job"""
+    job = jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job.summary()
+
+
+@app.post("/api/datasets", summary="Upload Problem Dataset", status_code=201)
+async def upload_dataset(request: Dict):
+    """
+    Compile a problem dataset and keep it for /api/optimize and /api/jobs
+    
+    Request body: {"bays": [...], "trains": [...], "cleaning_slots": [...]}
+    with the fields of depot_layout.json bays and of rakes.csv and
+    cleaning_slots.csv rows. Returns the dataset_id to pass with requests.
+    """
+    try:
+        dataset_id, dataset = datasets.add(request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _dataset_summary(dataset_id, dataset)
+
+
+@app.get("/api/datasets", summary="List Problem Datasets")
+async def list_datasets():
+    """Uploaded datasets still kept, least recently used first"""
+    return {"datasets": datasets.list(), "max_datasets": datasets.max_size}
+
+
+@app.delete("/api/datasets/{dataset_id}", summary="Delete Problem Dataset")
+async def delete_dataset(dataset_id: str):
+    """Forget an uploaded dataset; jobs already submitted keep their copy"""
+    if not datasets.remove(dataset_id):
+        raise HTTPException(status_code=404, detail=f"Dataset not found: {dataset_id}")
+    return {"dataset_id": dataset_id, "deleted": True}
+
+
+@app.get("/api/depots", summary="List Depots")
+async def list_depots():
+    """Depots this API can serve, and which of them are loaded"""
+    return {
+        "depots": [{"depot_id": depot_id, "loaded": depots.is_loaded(depot_id)}
+                   for depot_id in depots.depot_ids()],
+        "registry": depots.stats()
+    }
+
+
+@app.post("/api/depots/{depot_id}/reload", summary="Reload Depot Data")
+async def reload_depot(depot_id: str):
+    """
+    Check a loaded depot's data files now and hot reload the changed ones
+    
+    Requests already do this at most every OPTIMIZER_RELOAD_CHECK_SECONDS;
+    this endpoint skips the wait, e.g. right after a nightly data drop.
+    """
+    _depot(depot_id)
+    reloaded = depots.refresh(depot_id, force=True)
+    return {
+        "depot_id": depot_id,
+        "reloaded": reloaded,
+        "fingerprint": _depot(depot_id).data_fingerprint()
+    }
+
+
 @app.get("/api/depot/layout", summary="Get Depot Layout")
-async def get_depot_layout():
-    """Get information about all depot bays"""
+async def get_depot_layout(depot: Optional[str] = None):
+    """Get information about all depot bays (of the default depot, or depot)"""
     bays = []
-    for bay_id, bay in optimizer.depot_bays.items():
+    for bay_id, bay in _depot(depot).depot_bays.items():
         bays.append({
             "id": bay.id,
             "capacity": bay.capacity,
@@ -556,10 +4094,10 @@ async def get_depot_layout():
 
 
 @app.get("/api/trains", summary="Get Train Information")
-async def get_trains():
-    """Get information about all trains requiring stabling"""
+async def get_trains(depot: Optional[str] = None):
+    """Get information about all trains requiring stabling (at the default depot, or depot)"""
     trains = []
-    for train in optimizer.trains:
+    for train in _depot(depot).trains:
         trains.append({
             "id": train.id,
             "length": train.length,
@@ -576,10 +4114,10 @@ async def get_trains():
 
 
 @app.get("/api/cleaning-slots", summary="Get Cleaning Schedule")
-async def get_cleaning_slots():
-    """Get information about cleaning time slots"""
+async def get_cleaning_slots(depot: Optional[str] = None):
+    """Get information about cleaning time slots (of the default depot, or depot)"""
     slots = []
-    for slot in optimizer.cleaning_slots:
+    for slot in _depot(depot).cleaning_slots:
         slots.append({
             "bay_id": slot.bay_id,
             "start_time": slot.start_time,
@@ -602,7 +4140,8 @@ async def simulate_scenario(request: Dict):
     {
         "generations": 30,
         "population_size": 50,
-        "scenario_name": "peak_hours"
+        "scenario_name": "peak_hours",
+        "depot": null
     }
     """
     try:
@@ -626,6 +4165,7 @@ if __name__ == "__main__":
     print("  - depot_layout.json (depot bay configuration)")
     print("  - rakes.csv (train data)")
     print("  - cleaning_slots.csv (cleaning schedule)")
+    print(f"📁 Further depots are read from {DEPOTS_DIR}/<depot_id>/")
     print()
     
     uvicorn.run(
@@ -0,0 +1,236 @@
+"""
+Randomized equivalence checks for the optimizer's pair-counting paths
+
+The scalar and population Fenwick counts, the track-graph count, the lane
+checks and the incremental evaluator must all agree with a brute-force count
+over every pair of trains. Run with: python -m pytest test_optimize_equivalence.py
+"""
+import itertools
+import os
+import random
+
+import numpy as np
+import pytest
+
+from optimize import IncrementalEvaluator, StablingOptimizer
+
+SEEDS = range(6)
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def random_problem(seed: int, trains: int = 24, bays: int = 12, graph: bool = False,
+                   arrivals: bool = False, slots: bool = False) -> StablingOptimizer:
+    """
+    A random depot; with graph, bays list connections to random other bays,
+    with slots, each bay gets up to two cleaning slots, so lanes run short
+    """
+    rng = random.Random(seed)
+    payload = {
+        "bays": [{
+            "id": f"B{b}",
+            "capacity": rng.choice([75, 80, 160, 240]),
+            "cleaning_enabled": rng.random() < 0.7,
+            "distance_to_exit": rng.randrange(0, 6),
+            "connections": ([f"B{rng.randrange(bays)}" for _ in range(rng.randrange(1, 3))]
+                            if graph else [])
+        } for b in range(bays)],
+        "trains": [{
+            "train_id": f"T{t}",
+            "length": rng.choice([60, 65, 70, 75, 80]),
+            "needs_cleaning": rng.random() < 0.4,
+            # Few distinct times, so equal departures are common
+            "departure_time": f"{rng.randrange(5, 9):02d}:{rng.choice([0, 30]):02d}",
+            "readiness": rng.choice(["ready", "maintenance", "cleaning"]),
+            "priority": rng.randrange(1, 6),
+            **({"arrival_time": f"{rng.randrange(18, 24):02d}:{rng.randrange(60):02d}"}
+               if arrivals else {})
+        } for t in range(trains)],
+        "cleaning_slots": [{
+            "bay_id": f"B{b}",
+            "start_time": f"{hour:02d}:00",
+            "end_time": f"{hour + 1:02d}:00",
+            "available": rng.random() < 0.9
+        } for b in range(bays) for hour in rng.sample([2, 4, 6, 18, 20, 22], rng.randrange(3))]
+        if slots else []
+    }
+    return StablingOptimizer.from_payload(payload)
+
+
+def random_genomes(optimizer: StablingOptimizer, count: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    problem = optimizer.problem
+    return rng.integers(0, problem.bay_count, size=(count, problem.train_count))
+
+
+def brute_shunting(optimizer: StablingOptimizer, genome) -> int:
+    """(earlier, later) departure pairs where the later train is in the way"""
+    problem = optimizer.problem
+    departures = problem.train_departure
+    moves = 0
+    for i, first in enumerate(genome):
+        for j, second in enumerate(genome):
+            if departures[i] >= departures[j]:
+                continue
+            if problem.has_track_graph:
+                moves += int(second) in problem.exit_path(int(first))
+            else:
+                moves += (problem.bay_distance_to_exit[first]
+                          > problem.bay_distance_to_exit[second])
+    return moves
+
+
+def brute_lane_spill(optimizer: StablingOptimizer, genome) -> np.ndarray:
+    """Trains that fit their bay alone but not behind the earlier arrivals there"""
+    problem = optimizer.problem
+    lengths, ranks = problem.train_length, problem.train_arrival_rank
+    spilled = np.zeros(len(genome), dtype=bool)
+    for i, bay in enumerate(genome):
+        filled = sum(lengths[j] for j in range(len(genome))
+                     if genome[j] == bay and ranks[j] <= ranks[i])
+        capacity = problem.bay_capacity[bay]
+        spilled[i] = lengths[i] <= capacity < filled
+    return spilled
+
+
+def brute_lane_cleaning(optimizer: StablingOptimizer, genome, spilled) -> float:
+    """Most score the lanes' slots can earn: best subset of wanting trains that fits them"""
+    problem = optimizer.problem
+    best_total = 0.0
+    for bay in set(genome.tolist()):
+        wanting = [i for i in range(len(genome)) if genome[i] == bay and not spilled[i]
+                   and problem.train_needs_cleaning[i]
+                   and problem.train_length[i] <= problem.bay_capacity[bay]
+                   and problem.cleaning_ok(i, bay)]
+        losses = {i: float(optimizer._gene_scores(i, bay) - optimizer._gene_scores(i, bay, unserved=True))
+                  for i in wanting}
+        best = 0.0
+        for size in range(len(wanting) + 1):
+            for kept in itertools.combinations(wanting, size):
+                ready = sorted(int(problem.slots_ready(i, bay)) for i in kept)
+                if all(count > k for k, count in enumerate(ready)):
+                    best = max(best, sum(losses[i] for i in kept))
+        best_total += best
+    return best_total
+
+
+def brute_lane_blocking(optimizer: StablingOptimizer, genome) -> int:
+    """Pairs sharing a lane where the earlier arrival departs first"""
+    problem = optimizer.problem
+    departures, ranks = problem.train_departure, problem.train_arrival_rank
+    return sum(1 for i in range(len(genome)) for j in range(len(genome))
+               if genome[i] == genome[j] and ranks[i] < ranks[j]
+               and departures[i] < departures[j])
+
+
+@pytest.mark.parametrize("graph", [False, True])
+@pytest.mark.parametrize("seed", SEEDS)
+def test_shunting_counts_match_brute_force(seed, graph):
+    optimizer = random_problem(seed, graph=graph)
+    assert optimizer.problem.has_track_graph == graph
+    genomes = random_genomes(optimizer, 8, seed)
+
+    population = optimizer._population_shunting_moves(genomes)
+    for genome, moves in zip(genomes, population):
+        expected = brute_shunting(optimizer, genome)
+        assignments = [(train, optimizer.problem.bay_ids[bay])
+                       for train, bay in zip(optimizer.trains, genome)]
+        assert moves == expected
+        assert optimizer.calculate_shunting_moves(assignments) == expected
+
+
+@pytest.mark.parametrize("arrivals", [False, True])
+@pytest.mark.parametrize("seed", SEEDS)
+def test_lane_checks_match_brute_force(seed, arrivals):
+    optimizer = random_problem(seed, bays=5, arrivals=arrivals)
+    optimizer.set_capacity_mode("lane")
+    genomes = random_genomes(optimizer, 8, seed)
+
+    spilled, blocked = optimizer._lane_checks(genomes)
+    for genome, spills, pairs in zip(genomes, spilled, blocked):
+        assert (spills == brute_lane_spill(optimizer, genome)).all()
+        assert pairs == brute_lane_blocking(optimizer, genome)
+        assignments = optimizer.build_assignments(genome)
+        assert sum(len(a["blockedBy"]) for a in assignments) == pairs
+        assert (sum("lane_over_capacity" in a["violations"] for a in assignments)
+                == np.count_nonzero(spills))
+    if not arrivals:
+        # A free lane order never forces blocking
+        assert not blocked.any()
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_lane_cleaning_keeps_the_best_trains_a_slot_each(seed):
+    optimizer = random_problem(seed, bays=5, slots=True)
+    optimizer.set_capacity_mode("lane")
+    problem = optimizer.problem
+    genomes = random_genomes(optimizer, 32, seed)
+    spilled, _ = optimizer._lane_checks(genomes)
+    unserved = optimizer._lane_cleaning(genomes, spilled)
+    assert unserved.any()
+
+    train_idx = np.arange(problem.train_count)
+    for genome, spills, left_out in zip(genomes, spilled, unserved):
+        wanting = (problem.train_needs_cleaning & ~spills
+                   & (problem.train_length <= problem.bay_capacity[genome])
+                   & problem.cleaning_ok(train_idx, genome))
+        kept = wanting & ~left_out
+        losses = (optimizer._gene_scores(train_idx, genome)
+                  - optimizer._gene_scores(train_idx, genome, unserved=np.ones(len(genome), bool)))
+        assert losses[kept].sum() == pytest.approx(brute_lane_cleaning(optimizer, genome, spills))
+        # Every kept train gets a slot of its own that ends by its departure
+        assignments = optimizer.build_assignments(genome)
+        slots = [(a["bayId"], a["cleaningSlot"]["start"]) for a, k in zip(assignments, kept) if k]
+        assert all(a["cleaningSlot"] for a, k in zip(assignments, kept) if k)
+        assert len(set(slots)) == len(slots)
+        assert not any(a["cleaningSlot"] for a, k in zip(assignments, left_out) if k)
+        assert (sum("cleaning_not_available" in a["violations"] for a in assignments)
+                == np.count_nonzero(problem.train_needs_cleaning & ~problem.cleaning_ok(
+                    train_idx, genome)) + np.count_nonzero(left_out))
+
+
+@pytest.mark.parametrize("mode", ["single", "lane"])
+@pytest.mark.parametrize("graph", [False, True])
+@pytest.mark.parametrize("seed", SEEDS)
+def test_incremental_evaluator_matches_population_score(seed, graph, mode):
+    optimizer = random_problem(seed, graph=graph, arrivals=mode == "lane", slots=True)
+    optimizer.set_capacity_mode(mode)
+    problem = optimizer.problem
+    rng = random.Random(seed)
+    evaluator = IncrementalEvaluator(optimizer, random_genomes(optimizer, 1, seed)[0].tolist())
+
+    for _ in range(60):
+        if rng.random() < 0.5:
+            evaluator.move(rng.randrange(problem.train_count), rng.randrange(problem.bay_count))
+        else:
+            evaluator.swap(rng.randrange(problem.train_count), rng.randrange(problem.train_count))
+        expected = optimizer.evaluate_population(np.array([evaluator.genes]))[0]
+        assert evaluator.raw_score == pytest.approx(expected)
+
+
+def test_lane_optimum_on_bundled_data_does_not_overfill_lanes():
+    """
+    Overfilling a lane must not pay off in the exact lane-mode optimum
+
+    No two bundled rakes fit one bay together (the shortest pair is 120 m,
+    the longest bay 80 m), so 20 rakes in 10 bays leave 10 capacity
+    violations that no plan avoids; the optimum must have exactly those
+    rather than packing extra trains into lanes for their bonuses.
+    """
+    pytest.importorskip("ortools")
+    optimizer = StablingOptimizer()
+    optimizer.load_depot_layout(os.path.join(HERE, "depot_layout.json"))
+    optimizer.load_trains(os.path.join(HERE, "rakes.csv"))
+    optimizer.load_cleaning_slots(os.path.join(HERE, "cleaning_slots.csv"))
+    optimizer.set_capacity_mode("lane")
+    problem = optimizer.problem
+
+    result = optimizer.optimize_cpsat(time_limit_ms=120000)
+    assert result["statistics"]["solver"]["status"] == "OPTIMAL"
+    over_capacity = [a for a in result["assignments"]
+                     if {"lane_over_capacity", "length_exceeds_capacity"} & set(a["violations"])]
+    assert len(over_capacity) == problem.train_count - problem.bay_count
+    parked = {a["bayId"] for a in result["assignments"] if a not in over_capacity}
+    assert len(parked) == problem.bay_count
+    genome = optimizer.assignment_genome(result["assignments"])
+    assert optimizer.evaluate_population(np.array([genome]))[0] == pytest.approx(
+        result["optimization_summary"]["objectiveScore"])